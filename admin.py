@@ -1,6 +1,21 @@
 from django.contrib import admin
-from .models import ItemRequest
+from .models import History, ItemRequest, resolve_history_objects
 
 
-admin.site.register(ItemRequest)
+class ItemRequestAdmin(admin.ModelAdmin):
+    list_filter = ['is_deleted']
 
+    def get_queryset(self, request):
+        # deleted requests stay reachable here until they are purged
+        return ItemRequest.all_objects.all()
+
+admin.site.register(ItemRequest, ItemRequestAdmin)
+
+
+class HistoryAdmin(admin.ModelAdmin):
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        changelist.result_list = resolve_history_objects(changelist.result_list)
+        return changelist
+
+admin.site.register(History, HistoryAdmin)
@@ -0,0 +1,142 @@
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.core.exceptions import FieldError, ValidationError
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.generic.base import View
+
+from . import search
+from .instrumentation import InstrumentedViewMixin
+from .models import ItemRequest
+from .pagination import KeysetPaginator
+from .views import ItemRequestList, itemrequest_changed, itemrequest_etag, itemrequest_vista_settings
+
+# Filter operators accepted as filterop__<field>, as in the list's vista form
+FILTER_OPERATORS = ['exact', 'in', 'icontains', 'gt', 'gte', 'lt', 'lte', 'isnull']
+
+VALUE_FIELDS = {
+    'price': ['price', 'price_currency'],
+    'submitted_by': ['submitted_by', 'submitted_by__username'],
+}
+
+
+class ApiError(Exception):
+    pass
+
+
+def api_fields(request, vista_settings):
+    fieldnames = [fieldname for fieldname in request.GET.get('fields', '').split(',') if fieldname]
+    for fieldname in fieldnames:
+        if fieldname not in vista_settings['columns_available']:
+            raise ApiError(f'Unknown field {fieldname}')
+
+    value_fields = ['pk']
+    for fieldname in fieldnames or ItemRequestList.default_columns:
+        value_fields.extend(VALUE_FIELDS.get(fieldname, [fieldname]))
+
+    return value_fields
+
+
+def api_queryset(request, vista_settings):
+    queryset = ItemRequest.objects.all()
+
+    for fieldname in vista_settings['filter_fields_available']:
+        values = request.GET.getlist('filterfield__' + fieldname)
+        if not values:
+            continue
+
+        operator = request.GET.get('filterop__' + fieldname, 'exact')
+        if operator not in FILTER_OPERATORS:
+            raise ApiError(f'Unknown filter operator {operator}')
+        if ItemRequest._meta.get_field(fieldname).get_lookup(operator) is None:
+            raise ApiError(f'Cannot filter {fieldname} by {operator}')
+
+        if operator == 'in':
+            value = [item for value in values for item in value.split(',')]
+        elif operator == 'isnull':
+            value = values[0].lower() in ('1', 'true', 'yes')
+        else:
+            value = values[0]
+
+        queryset = queryset.filter(**{f'{fieldname}__{operator}': value})
+
+    queryset = search.filter_queryset(queryset, request.GET.get('combined_text_search', ''))
+
+    order_by = [fieldname for value in request.GET.getlist('order_by') for fieldname in value.split(',') if fieldname]
+    for fieldname in order_by:
+        if fieldname not in vista_settings['order_by_fields_available']:
+            raise ApiError(f'Cannot order by {fieldname}')
+
+    return queryset, order_by or list(ItemRequest._meta.ordering)
+
+
+@method_decorator(condition(etag_func=itemrequest_etag, last_modified_func=itemrequest_changed), name='get')
+class ItemRequestApiList(InstrumentedViewMixin, PermissionRequiredMixin, View):
+    permission_required = 'wishlist.view_itemrequest'
+    raise_exception = True
+    page_size = 100
+    max_page_size = 1000
+
+    def get(self, request, *args, **kwargs):
+
+        vista_settings = itemrequest_vista_settings()
+
+        try:
+            value_fields = api_fields(request, vista_settings)
+            queryset, order_by = api_queryset(request, vista_settings)
+
+            page_size = int(request.GET.get('page_size', self.page_size))
+            if page_size < 1:
+                raise ApiError('page_size must be at least 1')
+            page_size = min(page_size, self.max_page_size)
+
+            paginator = KeysetPaginator(queryset, page_size, order_by)
+            if not paginator.is_supported:
+                raise ApiError('Cursor pagination needs an ordering on fields that cannot be empty')
+
+            key_fields = [name for name, field, descending in paginator.keys if name not in value_fields]
+            paginator.queryset = queryset.values(*value_fields, *key_fields)
+
+            # A cursor that decodes but holds values of the wrong type fails in the query
+            page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+        except (ApiError, FieldError, InvalidPage, ValidationError, ValueError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        for row in page.object_list:
+            for name in key_fields:
+                del row[name]
+
+        return JsonResponse({
+            'results': page.object_list,
+            'next': self.page_url(request, 'after', page.next_cursor),
+            'previous': self.page_url(request, 'before', page.previous_cursor),
+        })
+
+    def page_url(self, request, direction, cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query.pop('after', None)
+        query.pop('before', None)
+        query[direction] = cursor
+        return request.build_absolute_uri('?' + query.urlencode())
+
+
+@method_decorator(condition(etag_func=itemrequest_etag, last_modified_func=itemrequest_changed), name='get')
+class ItemRequestApiDetail(InstrumentedViewMixin, PermissionRequiredMixin, View):
+    permission_required = 'wishlist.view_itemrequest'
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+
+        try:
+            value_fields = api_fields(request, itemrequest_vista_settings())
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        row = ItemRequest.objects.filter(pk=kwargs['pk']).values(*value_fields).first()
+        if row is None:
+            raise Http404('No item request with that id')
+
+        return JsonResponse(row)
@@ -0,0 +1,148 @@
+import gzip
+import json
+import os
+from datetime import timedelta, timezone as datetime_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import History, HistoryArchive
+
+ARCHIVE_FIELDS = ['id', 'when', 'modelname', 'objectid', 'fieldname', 'old_value', 'new_value', 'user_id']
+
+
+def archive_root():
+    return getattr(settings, 'WISHLIST_HISTORY_ARCHIVE_DIR', os.path.join(getattr(settings, 'BASE_DIR', '.'), 'history_archive'))
+
+
+def partition_day(when):
+    if timezone.is_aware(when):
+        when = when.astimezone(datetime_timezone.utc)
+    return when.date()
+
+
+def partition_path(day, root=None):
+    # One gzip file per day, grouped by year and month so no directory grows too large
+
+    return os.path.join(root or archive_root(), f'{day:%Y}', f'{day:%m}', f'history-{day:%Y-%m-%d}.jsonl.gz')
+
+
+def archive_history(before, batch_size=5000, using='default', root=None):
+    # Moves History rows older than before into the archive, in pk order, one
+    # batch at a time so that memory use and lock time stay flat.  Each batch is
+    # appended to its partitions (a new gzip member per append) and flushed before
+    # the rows are deleted; if the delete fails the rows are archived again on the
+    # next run, and the reader drops the duplicates by id.  Returns the number
+    # of rows archived and the days written to.
+
+    archived = 0
+    days = set()
+    last_pk = 0
+
+    while True:
+        rows = list(
+            History.objects.using(using)
+            .filter(when__lt=before, pk__gt=last_pk)
+            .order_by('pk')
+            .values(*ARCHIVE_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return archived, days
+
+        rows_by_day = {}
+        for row in rows:
+            rows_by_day.setdefault(partition_day(row['when']), []).append(row)
+
+        for day, day_rows in rows_by_day.items():
+            write_partition(day, day_rows, root)
+
+        with transaction.atomic(using=using):
+            HistoryArchive.objects.using(using).bulk_create(
+                [
+                    HistoryArchive(day=day, modelname=modelname, objectid=objectid)
+                    for day, day_rows in rows_by_day.items()
+                    for modelname, objectid in {(row['modelname'], row['objectid']) for row in day_rows}
+                ],
+                ignore_conflicts=True
+            )
+            History.objects.using(using).filter(pk__in=[row['id'] for row in rows]).delete()
+
+        archived += len(rows)
+        days.update(rows_by_day)
+        last_pk = rows[-1]['id']
+
+
+def write_partition(day, rows, root=None):
+
+    path = partition_path(day, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with gzip.open(path, 'at', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(row, cls=DjangoJSONEncoder))
+            file.write('\n')
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_partition(day, root=None):
+    # Yields the archived rows of one day, without the duplicates an interrupted
+    # run may have left behind
+
+    path = partition_path(day, root)
+    if not os.path.exists(path):
+        return
+
+    seen = set()
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            row = json.loads(line)
+            if row['id'] in seen:
+                continue
+            seen.add(row['id'])
+            row['when'] = parse_datetime(row['when'])
+            yield row
+
+
+def compact_partition(day, root=None):
+    # Rewrites a partition appended to by several runs as a single gzip member
+
+    path = partition_path(day, root)
+    if not os.path.exists(path):
+        return 0
+
+    rows = sorted(read_partition(day, root), key=lambda row: row['id'])
+    compacted_path = path + '.compact'
+    with gzip.open(compacted_path, 'wt', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(row, cls=DjangoJSONEncoder))
+            file.write('\n')
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(compacted_path, path)
+
+    return len(rows)
+
+
+def object_history(modelname, objectid, using='default', root=None):
+    # The full history of one object, newest first: the live History rows plus
+    # the archived rows, read only from the partitions the index says hold them.
+    # Archived rows come back as unsaved History instances.
+
+    histories = list(History.objects.using(using).filter(modelname=modelname, objectid=objectid))
+
+    days = HistoryArchive.objects.using(using).filter(modelname=modelname, objectid=objectid).values_list('day', flat=True)
+    for day in days:
+        for row in read_partition(day, root):
+            if row['modelname'] == modelname and row['objectid'] == objectid:
+                histories.append(History(**row))
+
+    histories.sort(key=lambda history: (history.when, history.pk), reverse=True)
+    return histories
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=getattr(settings, 'WISHLIST_HISTORY_RETENTION_DAYS', 365))
@@ -0,0 +1,176 @@
+import asyncio
+import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.generic.base import View
+
+from .models import ItemRequest
+from .pagination import EstimatedCountPaginator, KeysetPaginator
+from .views import (ItemRequestDetail, ItemRequestList, UserLookup,
+                    itemrequest_changed, itemrequest_etag,
+                    itemrequest_list_etag)
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    # condition() for async view methods. The ETag and Last-Modified functions
+    # use the ORM, the session and the cache, so they run in a thread.
+
+    def conditional_values(request, *args, **kwargs):
+        last_modified = None
+        if last_modified_func:
+            changed = last_modified_func(request, *args, **kwargs)
+            if changed:
+                if not timezone.is_aware(changed):
+                    changed = timezone.make_aware(changed, datetime.timezone.utc)
+                last_modified = int(changed.timestamp())
+        etag = etag_func(request, *args, **kwargs) if etag_func else None
+        return quote_etag(etag) if etag is not None else None, last_modified
+
+    def decorator(method):
+        @wraps(method)
+        async def inner(self, request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(conditional_values)(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await method(self, request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+
+    return decorator
+
+
+class AsyncPermissionRequiredMixin:
+    # The permission check of PermissionRequiredMixin for views whose handlers
+    # are coroutines. It replaces the synchronous dispatch of the view it is
+    # mixed into, including the query timing of InstrumentedViewMixin, which
+    # cannot follow queries made from the async ORM's thread.
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await sync_to_async(self.has_permission)():
+            return await sync_to_async(self.handle_no_permission)()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+
+class AsyncItemRequestDetail(AsyncPermissionRequiredMixin, ItemRequestDetail):
+
+    async def aget_history_page(self):
+        try:
+            return await self.get_history_paginator().apage(after=self.request.GET.get('history_after'), before=self.request.GET.get('history_before'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+
+    @async_condition(etag_func=itemrequest_etag, last_modified_func=itemrequest_changed)
+    async def get(self, request, *args, **kwargs):
+
+        # the history is keyed on the pk in the url, so it need not wait for the request
+        try:
+            self.object, history_page = await asyncio.gather(
+                self.get_queryset().select_related('submitted_by').aget(pk=self.kwargs['pk']),
+                self.aget_history_page(),
+            )
+        except ItemRequest.DoesNotExist:
+            raise Http404('No item request found matching the query')
+
+        return self.render_to_response(self.get_context_data(object=self.object, history_page=history_page))
+
+
+class AsyncItemRequestList(AsyncPermissionRequiredMixin, ItemRequestList):
+
+    async def aget_list(self, request, *args, **kwargs):
+
+        # resolving the vista reads the session, the cache and tougshire_vistas, all synchronous
+        self.object_list = await sync_to_async(self.get_queryset)()
+
+        page_size = self.get_paginate_by(self.object_list)
+        if page_size:
+            self.async_pagination = await self.apaginate_queryset(self.object_list, page_size)
+
+        return self.render_to_response(self.get_context_data())
+
+    @async_condition(etag_func=itemrequest_list_etag)
+    async def get(self, request, *args, **kwargs):
+        return await self.aget_list(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.aget_list(request, *args, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.async_pagination
+
+    async def acount(self, paginator):
+        if isinstance(paginator, EstimatedCountPaginator):
+            return await sync_to_async(lambda: paginator.count)()
+        return await paginator.object_list.acount()
+
+    async def apaginate_queryset(self, queryset, page_size):
+
+        if self.pagination_mode == 'keyset':
+            paginator = KeysetPaginator(queryset, page_size, self.get_ordering_fields(queryset))
+            if paginator.is_supported:
+                try:
+                    page = await paginator.apage(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+                except InvalidPage as e:
+                    raise Http404(str(e))
+                return (paginator, page, page.object_list, page.has_other_pages())
+
+        orphans = self.get_paginate_orphans()
+        paginator = self.get_paginator(queryset, page_size, orphans=orphans, allow_empty_first_page=self.get_allow_empty())
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+
+        # a numbered page can be fetched while it is counted; "last" has to wait for the count
+        try:
+            number = int(page_number)
+        except (TypeError, ValueError):
+            number = 0
+
+        object_list = None
+        if number > 0:
+            offset = (number - 1) * page_size
+            paginator.count, object_list = await asyncio.gather(
+                self.acount(paginator),
+                self.alist(queryset[offset:offset + page_size + orphans]),
+            )
+        else:
+            paginator.count = await self.acount(paginator)
+
+        try:
+            page = paginator.page(paginator.num_pages if page_number == 'last' else page_number)
+        except InvalidPage as e:
+            raise Http404(str(e))
+
+        if object_list is None:
+            object_list = await self.alist(page.object_list)
+        else:
+            object_list = object_list[:page.end_index() - page.start_index() + 1 if paginator.count else 0]
+
+        page.object_list = object_list
+        return (paginator, page, object_list, page.has_other_pages())
+
+    async def alist(self, queryset):
+        return [object async for object in queryset]
+
+
+class AsyncUserLookup(AsyncPermissionRequiredMixin, UserLookup):
+
+    async def get(self, request, *args, **kwargs):
+
+        cache_key, users = self.get_lookup(request)
+        results = await cache.aget(cache_key)
+
+        if results is None:
+            results = self.lookup_results([user async for user in users])
+            await cache.aset(cache_key, results, self.cache_timeout)
+
+        return JsonResponse(results)
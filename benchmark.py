@@ -0,0 +1,191 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from djmoney.money import Money
+from tougshire_vistas.models import Vista
+
+from . import duplicates, search
+from .models import OPEN_STATUSES, History, ItemRequest, rebuild_budget_rollups
+
+# The most queries each view may run at any scale. The tests and the benchmark
+# command both hold the views to these.
+QUERY_BUDGETS = {
+    'list': 15,
+    'list_filtered': 20,
+    'list_search': 20,
+    'list_deep_page': 15,
+    'triage': 8,
+    'detail': 6,
+    'create_form': 6,
+    'create': 22,
+    'create_duplicate': 10,
+    'update': 22,
+    'bulk_update': 15,
+    'api_list': 6,
+    'api_detail': 6,
+}
+
+WORDS = [
+    'monitor', 'laptop', 'cable', 'chair', 'desk', 'printer', 'toner', 'scanner', 'keyboard', 'mouse',
+    'headset', 'projector', 'router', 'switch', 'battery', 'charger', 'tablet', 'camera', 'speaker', 'shelf',
+]
+
+
+def seed(requests=1000, history=10000, users=50, vistas=10, batch_size=5000, seed=0, prefix='benchmark'):
+    randomizer = random.Random(seed)
+
+    user_model = get_user_model()
+    user_model.objects.bulk_create(
+        [user_model(username=f'{prefix}{number}') for number in range(users)],
+        batch_size=batch_size
+    )
+    user_pks = list(user_model.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+
+    today = date.today()
+    for start in range(0, requests, batch_size):
+        ItemRequest.objects.bulk_create([
+            ItemRequest(
+                description=' '.join(randomizer.sample(WORDS, 3)),
+                purpose=' '.join(randomizer.sample(WORDS, 4)),
+                notes=' '.join(randomizer.choices(WORDS, k=40)),
+                price=Money(Decimal(randomizer.randint(100, 100000)) / 100, 'USD'),
+                quantity=randomizer.randint(1, 20),
+                link=f'https://example.com/{number}',
+                substitutability=randomizer.choice([1, 2, 3]),
+                urgency=randomizer.randint(1, 5),
+                status=randomizer.choice([1, 1, 2, 3, 5]),
+                submitted_by_id=randomizer.choice(user_pks),
+                when=today - timedelta(days=randomizer.randint(0, 2000)),
+            ) for number in range(start, min(start + batch_size, requests))
+        ])
+    itemrequest_pks = list(ItemRequest.objects.values_list('pk', flat=True))
+
+    for start in range(0, history, batch_size):
+        History.objects.bulk_create([
+            History(
+                modelname='ItemRequest',
+                objectid=randomizer.choice(itemrequest_pks),
+                fieldname='status',
+                old_value='1',
+                new_value=str(randomizer.choice([2, 3, 5])),
+                user_id=randomizer.choice(user_pks),
+            ) for number in range(start, min(start + batch_size, history))
+        ])
+
+    Vista.objects.bulk_create([
+        Vista(user_id=randomizer.choice(user_pks), model_name='wishlist.itemrequest', name=f'{prefix} {number}')
+        for number in range(vistas)
+    ])
+
+    search.rebuild_index()
+    duplicates.rebuild_index(batch_size)
+    rebuild_budget_rollups()
+
+    return itemrequest_pks
+
+
+def scenarios(itemrequest_pks):
+    pk = itemrequest_pks[len(itemrequest_pks) // 2]
+    last_page = max(len(itemrequest_pks) // 30, 1)
+    duplicate = ItemRequest.objects.filter(status__in=OPEN_STATUSES).only('description', 'purpose').first()
+    submitter = ItemRequest.objects.filter(pk=pk).values_list('submitted_by', flat=True).get()
+
+    return [
+        ('list', 'get', reverse('wishlist:itemrequest-list'), {}),
+        # before the posts below, which leave the user's vista filtered
+        ('list_deep_page', 'get', reverse('wishlist:itemrequest-list') + f'?page={last_page}', {}),
+        ('list_filtered', 'post', reverse('wishlist:itemrequest-list'), {
+            'vista_query_submitted': 'True',
+            'filterop__submitted_by': 'in',
+            'filterfield__submitted_by': [str(itemrequest.submitted_by_id) for itemrequest in ItemRequest.objects.filter(pk__in=itemrequest_pks[:5])],
+            'order_by': ['-when'],
+        }),
+        ('list_search', 'post', reverse('wishlist:itemrequest-list'), {
+            'vista_query_submitted': 'True',
+            'combined_text_search': 'monitor cable',
+        }),
+        ('triage', 'get', reverse('wishlist:itemrequest-triage') + '?n=50', {}),
+        ('detail', 'get', reverse('wishlist:itemrequest-detail', kwargs={'pk': pk}), {}),
+        ('create_form', 'get', reverse('wishlist:itemrequest-create'), {}),
+        ('create', 'post', reverse('wishlist:itemrequest-create'), {
+            'description': 'Benchmark request',
+            'purpose': 'Benchmark',
+            'price_0': '19.99',
+            'price_1': 'USD',
+            'quantity': 1,
+            'substitutability': 2,
+            'urgency': 3,
+            'status': 1,
+            'submitted_by': submitter,
+            'when': date.today().isoformat(),
+            'not_duplicate': '1',
+        }),
+        ('create_duplicate', 'post', reverse('wishlist:itemrequest-create'), {
+            'description': duplicate.description,
+            'purpose': duplicate.purpose,
+            'quantity': 1,
+            'substitutability': 2,
+            'urgency': 3,
+            'status': 1,
+            'submitted_by': submitter,
+            'when': date.today().isoformat(),
+        }),
+        ('update', 'post', reverse('wishlist:itemrequest-update', kwargs={'pk': pk}), {
+            'description': 'Benchmark update',
+            'purpose': 'Benchmark',
+            'notes': 'Updated by the benchmark',
+            'price_0': '29.99',
+            'price_1': 'USD',
+            'quantity': 2,
+            'substitutability': 1,
+            'urgency': 2,
+            'status': 2,
+            'submitted_by': submitter,
+            'when': date.today().isoformat(),
+        }),
+        ('bulk_update', 'post', reverse('wishlist:itemrequest-bulk-update'), {
+            'bulk_action': 'status:2',
+            'selected': [str(pk) for pk in itemrequest_pks[:30]],
+        }),
+        ('api_list', 'get', reverse('wishlist:api-itemrequest-list') + '?fields=description,status,price&page_size=100', {}),
+        ('api_detail', 'get', reverse('wishlist:api-itemrequest-detail', kwargs={'pk': pk}), {}),
+    ]
+
+
+def measure(client, name, method, url, data, repeat=5):
+    timings = []
+    query_counts = []
+
+    for attempt in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+
+    sql_times = [float(query['time']) * 1000 for query in queries.captured_queries]
+
+    return {
+        'view': name,
+        'status_code': response.status_code,
+        'first_ms': round(timings[0], 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': max(query_counts),
+        'last_sql_ms': round(sum(sql_times), 2),
+        'query_budget': QUERY_BUDGETS.get(name),
+        'within_budget': QUERY_BUDGETS.get(name) is None or max(query_counts) <= QUERY_BUDGETS[name],
+    }
+
+
+def run(client, itemrequest_pks, repeat=5):
+    return [measure(client, name, method, url, data, repeat) for name, method, url, data in scenarios(itemrequest_pks)]
@@ -0,0 +1,226 @@
+import hashlib
+import re
+import struct
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import OPEN_STATUSES, ItemRequest, SimilarityBucket
+
+DUPLICATE_FIELDS = ['description', 'purpose']
+
+SHINGLE_SIZE = 3
+
+# 16 bands of 4 rows: requests whose shingles have a Jaccard similarity of 0.5
+# share a bucket in some band about 64% of the time, and at 0.8 over 99%
+BANDS = 16
+ROWS = 4
+
+# At most this many candidates, those sharing the most bands, are compared in full
+MAX_CANDIDATES = 200
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _hash_parameters():
+    # Fixed, so that signatures written by one process match those of another
+    parameters = []
+    for number in range(BANDS * ROWS):
+        digest = hashlib.blake2b(f'wishlist-minhash-{number}'.encode(), digest_size=16).digest()
+        a, b = struct.unpack('<QQ', digest)
+        parameters.append((a % (MERSENNE_PRIME - 1) + 1, b % MERSENNE_PRIME))
+    return parameters
+
+
+HASH_PARAMETERS = _hash_parameters()
+
+
+def duplicate_threshold():
+    return getattr(settings, 'WISHLIST_DUPLICATE_THRESHOLD', 0.5)
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def shingles(description, purpose=''):
+    # The character n-grams of both fields, so that reworded or misspelled
+    # descriptions of the same item still overlap
+
+    shingle_set = set()
+    for text in (normalize(description), normalize(purpose)):
+        if not text:
+            continue
+        text = f' {text} '
+        shingle_set.update(text[start:start + SHINGLE_SIZE] for start in range(max(len(text) - SHINGLE_SIZE + 1, 1)))
+    return shingle_set
+
+
+def jaccard(shingles_a, shingles_b):
+    if not shingles_a or not shingles_b:
+        return 0.0
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def signature(shingle_set):
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little') for shingle in shingle_set]
+    return [min((a * value + b) % MERSENNE_PRIME for value in hashes) for a, b in HASH_PARAMETERS]
+
+
+def band_buckets(shingle_set):
+    # [(band, bucket)] for a set of shingles, or [] if it is empty
+
+    if not shingle_set:
+        return []
+
+    minhashes = signature(shingle_set)
+    buckets = []
+    for band in range(BANDS):
+        rows = minhashes[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f'<{ROWS}Q', *rows), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, 'little', signed=True)))
+    return buckets
+
+
+def index_itemrequests(itemrequests, using='default'):
+
+    itemrequests = [itemrequest for itemrequest in itemrequests if itemrequest.pk is not None]
+    if not itemrequests:
+        return
+
+    with transaction.atomic(using=using):
+        SimilarityBucket.objects.using(using).filter(itemrequest_id__in=[itemrequest.pk for itemrequest in itemrequests]).delete()
+        SimilarityBucket.objects.using(using).bulk_create([
+            SimilarityBucket(itemrequest_id=itemrequest.pk, band=band, bucket=bucket)
+            for itemrequest in itemrequests
+            for band, bucket in band_buckets(shingles(itemrequest.description, itemrequest.purpose))
+        ])
+
+
+def rebuild_index(batch_size=1000, using='default'):
+    # Indexes every request, deleted ones included so that a restore needs no
+    # reindexing; lookups filter on the live, open requests
+
+    with transaction.atomic(using=using):
+        SimilarityBucket.objects.using(using).all().delete()
+
+        indexed = 0
+        last_pk = 0
+        while True:
+            itemrequests = list(
+                ItemRequest.all_objects.using(using)
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', *DUPLICATE_FIELDS)[:batch_size]
+            )
+            if not itemrequests:
+                return indexed
+
+            SimilarityBucket.objects.using(using).bulk_create([
+                SimilarityBucket(itemrequest_id=itemrequest.pk, band=band, bucket=bucket)
+                for itemrequest in itemrequests
+                for band, bucket in band_buckets(shingles(itemrequest.description, itemrequest.purpose))
+            ])
+            indexed += len(itemrequests)
+            last_pk = itemrequests[-1].pk
+
+
+def similar_requests(description, purpose='', queryset=None, threshold=None, limit=5):
+    # The requests in queryset (by default the open ones) whose description and
+    # purpose are at least threshold similar, most similar first, each with its
+    # similarity set. Only the requests sharing a bucket are read, one index
+    # seek per band, so the cost does not grow with the number of requests.
+
+    queryset = ItemRequest.objects.filter(status__in=OPEN_STATUSES) if queryset is None else queryset
+    threshold = duplicate_threshold() if threshold is None else threshold
+
+    shingle_set = shingles(description, purpose)
+    buckets = band_buckets(shingle_set)
+    if not buckets:
+        return []
+
+    candidate_pks = (
+        SimilarityBucket.objects.using(queryset.db)
+        .filter(reduce(or_, [Q(band=band, bucket=bucket) for band, bucket in buckets]))
+        .filter(itemrequest__in=queryset.values('pk'))
+        .values('itemrequest_id')
+        .annotate(shared=Count('pk'))
+        .order_by('-shared')
+        .values_list('itemrequest_id', flat=True)[:MAX_CANDIDATES]
+    )
+
+    similar = []
+    for itemrequest in queryset.filter(pk__in=list(candidate_pks)):
+        itemrequest.similarity = jaccard(shingle_set, shingles(itemrequest.description, itemrequest.purpose))
+        if itemrequest.similarity >= threshold:
+            similar.append(itemrequest)
+
+    similar.sort(key=lambda itemrequest: (-itemrequest.similarity, itemrequest.pk))
+    return similar[:limit]
+
+
+def duplicate_clusters(queryset=None, threshold=None, batch_size=1000):
+    # Groups the requests in queryset (by default the open ones) into clusters
+    # of likely duplicates: requests sharing a bucket are compared in full, and
+    # those at least threshold similar are joined. Streams the buckets in index
+    # order. Returns lists of pks, largest cluster first.
+
+    queryset = ItemRequest.objects.filter(status__in=OPEN_STATUSES) if queryset is None else queryset
+    threshold = duplicate_threshold() if threshold is None else threshold
+
+    parents = {}
+
+    def find(pk):
+        parents.setdefault(pk, pk)
+        while parents[pk] != pk:
+            parents[pk] = parents[parents[pk]]
+            pk = parents[pk]
+        return pk
+
+    shingle_cache = {}
+
+    def request_shingles(pks):
+        missing = [pk for pk in pks if pk not in shingle_cache]
+        for start in range(0, len(missing), batch_size):
+            for pk, description, purpose in ItemRequest._base_manager.using(queryset.db).filter(pk__in=missing[start:start + batch_size]).values_list('pk', *DUPLICATE_FIELDS):
+                shingle_cache[pk] = shingles(description, purpose)
+        return [shingle_cache.get(pk, set()) for pk in pks]
+
+    def join(members):
+        member_shingles = request_shingles(members)
+        for i, pk_a in enumerate(members):
+            for j in range(i + 1, len(members)):
+                pk_b = members[j]
+                root_a, root_b = find(pk_a), find(pk_b)
+                if root_a != root_b and jaccard(member_shingles[i], member_shingles[j]) >= threshold:
+                    parents[root_b] = root_a
+
+    buckets = (
+        SimilarityBucket.objects.using(queryset.db)
+        .filter(itemrequest__in=queryset.values('pk'))
+        .order_by('band', 'bucket', 'itemrequest_id')
+        .values_list('band', 'bucket', 'itemrequest_id')
+        .iterator(chunk_size=batch_size * BANDS)
+    )
+
+    current, members = None, []
+    for band, bucket, pk in buckets:
+        if (band, bucket) != current:
+            if len(members) > 1:
+                join(members)
+            current, members = (band, bucket), []
+        members.append(pk)
+    if len(members) > 1:
+        join(members)
+
+    clusters = {}
+    for pk in list(parents):
+        clusters.setdefault(find(pk), []).append(pk)
+
+    return sorted(
+        (sorted(cluster) for cluster in clusters.values() if len(cluster) > 1),
+        key=lambda cluster: (-len(cluster), cluster[0])
+    )
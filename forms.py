@@ -1,5 +1,6 @@
 from django import forms
 from django.forms import inlineformset_factory
+from django.urls import reverse_lazy
 from .models import ItemRequest
 
 from django.db import models
@@ -10,6 +11,29 @@ from wishlist.models import ItemRequest
 from django.contrib.auth import get_user_model
 from djmoney.models.fields import MoneyField
 
+class LookupSelect(forms.Select):
+    # Renders only the selected option; the rest are fetched from lookup_url as the user types
+
+    def __init__(self, lookup_url, attrs=None):
+        super().__init__(attrs)
+        self.lookup_url = lookup_url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-lookup-url'] = str(self.lookup_url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        options = [self.create_option(name, '', self.choices.field.empty_label or '', not any(value), 0, attrs=attrs)]
+
+        chosen = [pk for pk in value if pk not in (None, '')]
+        if chosen:
+            for index, object in enumerate(self.choices.queryset.filter(pk__in=chosen), start=1):
+                options.append(self.create_option(name, object.pk, self.choices.field.label_from_instance(object), True, index, attrs=attrs))
+
+        return [(None, options, 0)]
+
+
 class ItemRequestForm(forms.ModelForm):
     class Meta:
         model = ItemRequest
@@ -26,4 +50,6 @@ class ItemRequestForm(forms.ModelForm):
             'submitted_by',
             'when',
         ]
-
+        widgets = {
+            'submitted_by': LookupSelect(lookup_url=reverse_lazy('wishlist:user-lookup')),
+        }
@@ -0,0 +1,114 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('wishlist.instrumentation')
+
+SLOWEST_STATEMENTS = 5
+SAMPLES_PER_VIEW = 1000
+
+# Recent samples per view in this worker process, for the stats endpoint
+view_samples = defaultdict(lambda: deque(maxlen=SAMPLES_PER_VIEW))
+view_samples_lock = threading.Lock()
+
+
+class QueryRecorder:
+    # A database execute wrapper that counts and times every statement, keeping
+    # only the few slowest so the cost stays flat however many queries run
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.seconds += duration
+            if len(self.slowest) < SLOWEST_STATEMENTS:
+                heapq.heappush(self.slowest, (duration, sql))
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, sql))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def view_stats():
+    with view_samples_lock:
+        samples = {view: list(view_samples[view]) for view in view_samples}
+
+    stats = {}
+    for view, view_samples_list in samples.items():
+        stats[view] = {'requests': len(view_samples_list)}
+        for measure in ['total_ms', 'sql_ms', 'queries', 'vista_ms', 'render_ms']:
+            values = [sample[measure] for sample in view_samples_list if sample.get(measure) is not None]
+            stats[view][measure] = {
+                'p50': percentile(values, 0.5),
+                'p90': percentile(values, 0.9),
+                'p99': percentile(values, 0.99),
+            }
+
+    return {'pid': os.getpid(), 'views': stats}
+
+
+class InstrumentedViewMixin:
+
+    @contextmanager
+    def timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = getattr(self, 'instrument_timings', None)
+            if timings is not None:
+                timings[name] = timings.get(name, 0) + (time.perf_counter() - started) * 1000
+
+    def dispatch(self, request, *args, **kwargs):
+
+        if not getattr(settings, 'WISHLIST_INSTRUMENTATION', True):
+            return super().dispatch(request, *args, **kwargs)
+
+        self.instrument_timings = {}
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+
+        with connection.execute_wrapper(recorder):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                with self.timed('render_ms'):
+                    response.render()
+
+        sample = {
+            'view': type(self).__name__,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round((time.perf_counter() - started) * 1000, 2),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.seconds * 1000, 2),
+            'vista_ms': round(self.instrument_timings['vista_ms'], 2) if 'vista_ms' in self.instrument_timings else None,
+            'render_ms': round(self.instrument_timings['render_ms'], 2) if 'render_ms' in self.instrument_timings else None,
+            'slowest': [{'ms': round(duration * 1000, 2), 'sql': sql} for duration, sql in sorted(recorder.slowest, reverse=True)],
+        }
+
+        logger.info('%(view)s %(method)s %(status)s in %(total_ms)sms with %(queries)s queries', sample, extra={'wishlist': sample})
+
+        with view_samples_lock:
+            view_samples[sample['view']].append(sample)
+
+        return response
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import http.client
+import ipaddress
+import logging
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ItemRequest, LinkStatus
+
+logger = logging.getLogger(__name__)
+
+LINK_CACHE_PREFIX = 'wishlist:link:'
+
+# When the health in the cache last changed, for the pages' ETag and Last-Modified
+LINK_CHECKED_KEY = 'wishlist:links:checked'
+
+# At most this much of a GET body is read to keep its connection alive
+MAX_DRAIN_BYTES = 256 * 1024
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class PrivateAddressError(OSError):
+    pass
+
+
+def is_public_address(address):
+    # Whether an IP address may be checked: not private, loopback, link-local,
+    # reserved, multicast or unspecified, so links cannot probe internal services
+
+    address = ipaddress.ip_address(address.split('%')[0])
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+class PublicAddressMixin:
+    # Checks the address actually connected to, which may differ from the one
+    # LinkChecker resolved if the host's DNS changed in between
+
+    def connect(self):
+        super().connect()
+        peer = self.sock.getpeername()[0]
+        if not is_public_address(peer):
+            self.close()
+            raise PrivateAddressError('Refused the private or local address {}'.format(peer))
+
+
+class PublicHTTPConnection(PublicAddressMixin, http.client.HTTPConnection):
+    pass
+
+
+class PublicHTTPSConnection(PublicAddressMixin, http.client.HTTPSConnection):
+    pass
+
+
+def link_ttl():
+    return timedelta(hours=getattr(settings, 'WISHLIST_LINK_TTL_HOURS', 24))
+
+
+def link_cache_key(url):
+    return LINK_CACHE_PREFIX + hashlib.md5(url.encode()).hexdigest()
+
+
+def link_health(urls):
+    # The last known health of each link, from the cache alone so that a view
+    # never waits on the network or the link table. Unchecked links are left out.
+
+    keys = {link_cache_key(url): url for url in set(urls) if url}
+    if not keys:
+        return {}
+    return {keys[key]: health for key, health in cache.get_many(list(keys)).items()}
+
+
+def cache_link_statuses(statuses):
+    # Outlives the TTL so the views keep showing a result until the next run
+    cache.set_many(
+        {link_cache_key(status.url): status.health() for status in statuses},
+        int(link_ttl().total_seconds() * 2)
+    )
+    cache.set(LINK_CHECKED_KEY, timezone.now(), None)
+
+
+def links_checked():
+    return cache.get(LINK_CHECKED_KEY)
+
+
+def links_to_check(using='default', recheck_all=False):
+    # The distinct links of all requests, less those checked within the TTL
+
+    links = set(ItemRequest.objects.using(using).exclude(link='').values_list('link', flat=True).distinct())
+    if recheck_all:
+        return sorted(links)
+
+    fresh = set(LinkStatus.objects.using(using).filter(checked__gte=timezone.now() - link_ttl()).values_list('url', flat=True))
+    return sorted(links - fresh)
+
+
+def save_link_statuses(results, using='default'):
+
+    checked = timezone.now()
+    statuses = [
+        LinkStatus(
+            url=url,
+            status_code=status_code,
+            ok=status_code is not None and status_code < 400,
+            error=error[:200],
+            checked=checked
+        )
+        for url, (status_code, error) in results.items()
+    ]
+    LinkStatus.objects.using(using).bulk_create(
+        statuses,
+        update_conflicts=True,
+        unique_fields=['url'],
+        update_fields=['status_code', 'ok', 'error', 'checked']
+    )
+    return statuses
+
+
+class HostState:
+    # The idle keep-alive connections to one host, a limit on how many are in
+    # use at once, and the earliest time the next request may start
+
+    def __init__(self, max_connections):
+        self.idle = []
+        self.connections = asyncio.Semaphore(max_connections)
+        self.lock = asyncio.Lock()
+        self.next_request = 0.0
+        self.public = None
+
+    async def wait_turn(self, interval):
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_request > now:
+                await asyncio.sleep(self.next_request - now)
+                now = time.monotonic()
+            self.next_request = now + interval
+
+
+class LinkChecker:
+    # Checks links concurrently over a bounded pool of keep-alive http.client
+    # connections. The blocking calls run in a pool of max_connections threads;
+    # asyncio schedules them, limits the connections per host and overall,
+    # spaces out the requests to each host, and retries timeouts, connection
+    # errors and busy responses with backoff. Only http and https links to
+    # public addresses are checked unless WISHLIST_LINK_ALLOW_PRIVATE is set.
+
+    def __init__(self, max_connections=20, max_per_host=2, per_host_rate=2.0, timeout=10, retries=2, backoff=1.0):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.interval = 1 / per_host_rate if per_host_rate else 0
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.user_agent = getattr(settings, 'WISHLIST_LINK_USER_AGENT', 'wishlist-link-checker')
+        self.allow_private = getattr(settings, 'WISHLIST_LINK_ALLOW_PRIVATE', False)
+
+    async def check_all(self, urls):
+        # Returns {url: (status code or None, error)}
+
+        self.connections = asyncio.Semaphore(self.max_connections)
+        self.hosts = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix='wishlist-links')
+        try:
+            results = await asyncio.gather(*[self.check(url) for url in urls])
+        finally:
+            for host in self.hosts.values():
+                for connection in host.idle:
+                    connection.close()
+            self.executor.shutdown()
+
+        return dict(zip(urls, results))
+
+    async def check(self, url):
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return None, 'Not an http or https link'
+        try:
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        except ValueError:
+            return None, 'Not a valid port'
+
+        key = (parts.scheme, parts.netloc)
+        host = self.hosts.setdefault(key, HostState(self.max_per_host))
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+
+        if not self.allow_private:
+            try:
+                if not await self.resolves_public(host, parts.hostname, port):
+                    return None, 'Refused a private or local address'
+            except OSError as e:
+                return None, str(e) or type(e).__name__
+
+        status_code, error = None, ''
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                status_code = await self.fetch(host, key, path)
+            except PrivateAddressError as e:
+                return None, str(e)
+            except (OSError, http.client.HTTPException) as e:
+                status_code, error = None, str(e) or type(e).__name__
+                continue
+            if status_code in RETRY_STATUSES:
+                error = 'HTTP {}'.format(status_code)
+                continue
+            return status_code, ''
+
+        logger.info('Link check failed for %s: %s', url, error)
+        return status_code, error
+
+    async def resolves_public(self, host, hostname, port):
+        # Whether every address of the host is public, resolved once per host
+
+        async with host.lock:
+            if host.public is None:
+                addresses = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, socket.getaddrinfo, hostname, port, 0, socket.SOCK_STREAM
+                )
+                host.public = all(is_public_address(address[4][0]) for address in addresses)
+        return host.public
+
+    async def fetch(self, host, key, path):
+
+        async with self.connections, host.connections:
+            await host.wait_turn(self.interval)
+
+            loop = asyncio.get_running_loop()
+            reused = bool(host.idle)
+            connection = host.idle.pop() if reused else self.connect(key)
+            try:
+                try:
+                    status_code, reusable = await loop.run_in_executor(self.executor, self.request, connection, path)
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    if not reused:
+                        raise
+                    # the server closed the idle connection, which is not the link's
+                    # fault; http.client reconnects on the next request
+                    connection.close()
+                    status_code, reusable = await loop.run_in_executor(self.executor, self.request, connection, path)
+            except Exception:
+                connection.close()
+                raise
+
+            if reusable:
+                host.idle.append(connection)
+            else:
+                connection.close()
+
+            return status_code
+
+    def connect(self, key):
+        scheme, netloc = key
+        if scheme == 'https':
+            connection_class = http.client.HTTPSConnection if self.allow_private else PublicHTTPSConnection
+            return connection_class(netloc, timeout=self.timeout, context=ssl.create_default_context())
+        connection_class = http.client.HTTPConnection if self.allow_private else PublicHTTPConnection
+        return connection_class(netloc, timeout=self.timeout)
+
+    def request(self, connection, path):
+        # HEAD first, then GET for servers that refuse HEAD. Returns the status
+        # and whether the connection can be used again.
+
+        status_code, reusable = self.send(connection, 'HEAD', path)
+        if status_code in (403, 405, 501):
+            if not reusable:
+                connection.close()
+            status_code, reusable = self.send(connection, 'GET', path)
+        return status_code, reusable
+
+    def send(self, connection, method, path):
+
+        connection.request(method, path, headers={'User-Agent': self.user_agent, 'Accept': '*/*'})
+        response = connection.getresponse()
+
+        drained = 0
+        while drained <= MAX_DRAIN_BYTES:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                break
+            drained += len(chunk)
+
+        reusable = response.isclosed() and not response.will_close
+        if not response.isclosed():
+            response.close()
+        return response.status, reusable
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from wishlist.archive import archive_history, archive_root, compact_partition, default_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Moves old history rows into compressed, date-partitioned JSONL archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='archive rows older than this many days; defaults to WISHLIST_HISTORY_RETENTION_DAYS')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dir', help='archive directory; defaults to WISHLIST_HISTORY_ARCHIVE_DIR')
+        parser.add_argument('--compact', action='store_true', help='rewrite each partition written to as a single gzip member')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        before = default_cutoff() if options['days'] is None else timezone.now() - timedelta(days=options['days'])
+        root = options['dir'] or archive_root()
+
+        archived, days = archive_history(before, options['batch_size'], options['database'], root)
+        self.stdout.write('Archived {} history rows from before {} into {} partitions in {}'.format(archived, before, len(days), root))
+
+        if options['compact']:
+            for day in sorted(days):
+                compact_partition(day, root)
+            self.stdout.write('Compacted {} partitions'.format(len(days)))
@@ -0,0 +1,74 @@
+import timeit
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.test.utils import override_settings
+from djmoney.money import Money
+
+from wishlist.models import ItemRequest
+from wishlist.views import ItemRequestList, itemrequest_column_spec, itemrequest_labels
+
+# The list rows as they were rendered before the row renderer, one include per cell
+INCLUDE_TEMPLATE = '''{% for item in object_list %}<div class="row"><div class="listfield"><a href="{% url 'wishlist:itemrequest-detail' item.pk %}">view</a></div>
+{% if 'description' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.description %}{% endif %}
+{% if 'purpose' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.purpose %}{% endif %}
+{% if 'notes' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.notes %}{% endif %}
+{% if 'price' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.price %}{% endif %}
+{% if 'link' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.link %}{% endif %}
+{% if 'substitutability' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.get_substitutability_display %}{% endif %}
+{% if 'urgency' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.get_urgency_display %}{% endif %}
+{% if 'status' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.get_status_display %}{% endif %}
+{% if 'submitted_by' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.submitted_by %}{% endif %}
+{% if 'when' in show_columns or not show_columns %}{% include 'wishlist/_list_field.html' with field=item.when %}{% endif %}
+</div>{% endfor %}'''
+
+RENDERER_TEMPLATE = '{% load itemrequest_list %}{% list_rows object_list list_columns %}'
+
+
+class Command(BaseCommand):
+    help = 'Times the item request list rows rendered with per-cell includes against the row renderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[30, 300, 3000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Rows are built in memory so the timings cover template work only
+        user = get_user_model()(pk=1, username='benchmark')
+        list_columns = itemrequest_column_spec(ItemRequestList.default_columns)
+
+        self.stdout.write('{:>6} {:>12} {:>12} {:>12}'.format('rows', 'includes', 'renderer', 'cached'))
+
+        for rows in options['rows']:
+            object_list = [
+                ItemRequest(
+                    pk=number,
+                    description=f'Item {number}',
+                    purpose='Benchmark',
+                    notes='Notes ' * 20,
+                    price=Money(Decimal('19.99'), 'USD'),
+                    link=f'https://example.com/{number}',
+                    submitted_by=user,
+                ) for number in range(1, rows + 1)
+            ]
+            context = {
+                'object_list': object_list,
+                'list_columns': list_columns,
+                'itemrequest_labels': itemrequest_labels(),
+                'show_columns': [],
+            }
+
+            timings = []
+            with override_settings(WISHLIST_ROW_CACHE_TIMEOUT=0):
+                timings.append(self.time(INCLUDE_TEMPLATE, context, options['repeat']))
+                timings.append(self.time(RENDERER_TEMPLATE, context, options['repeat']))
+            Template(RENDERER_TEMPLATE).render(Context(context))
+            timings.append(self.time(RENDERER_TEMPLATE, context, options['repeat']))
+
+            self.stdout.write('{:>6} {:>10.2f}ms {:>10.2f}ms {:>10.2f}ms'.format(rows, *[timing * 1000 for timing in timings]))
+
+    def time(self, source, context, repeat):
+        template = Template(source)
+        return min(timeit.repeat(lambda: template.render(Context(context)), number=1, repeat=repeat))
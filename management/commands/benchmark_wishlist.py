@@ -0,0 +1,72 @@
+import json
+import platform
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from wishlist import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Seeds synthetic wishlist data, times every view and checks each against its query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--history', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--vistas', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+        parser.add_argument('--keep', action='store_true', help='keep the seeded data instead of rolling it back')
+        parser.add_argument('--no-budgets', action='store_true', help='report query budget overruns without failing')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                results = self.benchmark(options)
+                if not options['keep']:
+                    transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        over_budget = [result['view'] for result in results['views'] if not result['within_budget']]
+        if over_budget and not options['no_budgets']:
+            raise CommandError('Over the query budget: {}'.format(', '.join(over_budget)))
+
+    def benchmark(self, options):
+        self.stderr.write('Seeding {requests} requests, {history} history rows, {users} users and {vistas} vistas'.format(**options))
+        itemrequest_pks = benchmark.seed(
+            requests=options['requests'],
+            history=options['history'],
+            users=options['users'],
+            vistas=options['vistas'],
+            seed=options['seed'],
+        )
+
+        user = get_user_model().objects.create_superuser('benchmark-admin', 'benchmark@example.com', None)
+        client = Client()
+        client.force_login(user)
+
+        return {
+            'when': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'scale': {key: options[key] for key in ['requests', 'history', 'users', 'vistas']},
+            'repeat': options['repeat'],
+            'views': benchmark.run(client, itemrequest_pks, options['repeat']),
+        }
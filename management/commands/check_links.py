@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wishlist.links import LinkChecker, cache_link_statuses, links_to_check, save_link_statuses
+from wishlist.models import LinkStatus
+
+
+class Command(BaseCommand):
+    help = 'Checks the distinct item request links not checked within WISHLIST_LINK_TTL_HOURS and caches their health'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='check every link, however recently it was checked')
+        parser.add_argument('--max-connections', type=int, default=20)
+        parser.add_argument('--max-per-host', type=int, default=2)
+        parser.add_argument('--rate', type=float, default=2.0, help='requests per second to any one host')
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--retries', type=int, default=2)
+        parser.add_argument('--backoff', type=float, default=1.0, help='seconds before the first retry, doubling after that')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['max_connections'] < 1 or options['max_per_host'] < 1:
+            raise CommandError('--max-connections and --max-per-host must be at least 1')
+
+        urls = links_to_check(options['database'], options['all'])
+
+        started = time.monotonic()
+        checker = LinkChecker(
+            max_connections=options['max_connections'],
+            max_per_host=options['max_per_host'],
+            per_host_rate=options['rate'],
+            timeout=options['timeout'],
+            retries=options['retries'],
+            backoff=options['backoff'],
+        )
+        results = asyncio.run(checker.check_all(urls))
+        elapsed = time.monotonic() - started
+
+        save_link_statuses(results, options['database'])
+
+        # the fresh statuses are cached again too, in case the cache was cleared since
+        cache_link_statuses(LinkStatus.objects.using(options['database']).iterator())
+
+        broken = sum(1 for status_code, error in results.values() if status_code is None or status_code >= 400)
+        self.stdout.write('Checked {} links in {:.1f}s, {} broken'.format(len(results), elapsed, broken))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wishlist import duplicates
+from wishlist.models import OPEN_STATUSES, ItemRequest
+
+
+class Command(BaseCommand):
+    help = 'Lists clusters of likely duplicate item requests from the similarity index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, help='the similarity at which two requests are duplicates; defaults to WISHLIST_DUPLICATE_THRESHOLD')
+        parser.add_argument('--all', action='store_true', help='include received and canceled requests, not just open ones')
+        parser.add_argument('--rebuild', action='store_true', help='rebuild the similarity index first')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['threshold'] is not None and not 0 < options['threshold'] <= 1:
+            raise CommandError('--threshold must be above 0 and at most 1')
+
+        if options['rebuild']:
+            indexed = duplicates.rebuild_index(options['batch_size'], options['database'])
+            self.stdout.write('Indexed {} requests'.format(indexed))
+
+        queryset = ItemRequest.objects.using(options['database'])
+        if not options['all']:
+            queryset = queryset.filter(status__in=OPEN_STATUSES)
+
+        clusters = duplicates.duplicate_clusters(queryset, options['threshold'], options['batch_size'])
+
+        for cluster in clusters:
+            itemrequests = queryset.only('description', 'status').in_bulk(cluster)
+            self.stdout.write('Cluster of {}:'.format(len(cluster)))
+            for pk in cluster:
+                itemrequest = itemrequests[pk]
+                self.stdout.write('  {}: {} ({})'.format(pk, itemrequest, itemrequest.get_status_display()))
+
+        self.stdout.write('Found {} clusters covering {} requests'.format(len(clusters), sum(len(cluster) for cluster in clusters)))
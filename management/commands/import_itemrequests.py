@@ -0,0 +1,148 @@
+import csv
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from wishlist import duplicates, search
+from wishlist.forms import ItemRequestForm
+from wishlist.models import History, ItemRequest, add_budget_delta, update_budget_rollups
+from wishlist.views import history_changeset
+
+
+class ItemRequestImportForm(ItemRequestForm):
+    # submitted_by is resolved from the username cache instead of a query per row
+
+    class Meta(ItemRequestForm.Meta):
+        fields = [fieldname for fieldname in ItemRequestForm.Meta.fields if fieldname != 'submitted_by']
+
+
+class Command(BaseCommand):
+    help = 'Imports item requests from a JSONL or CSV file, validating each row with the item request form'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--user', help='username recorded as the author of the history rows')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        file_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'jsonl')
+
+        self.usernames = dict(get_user_model().objects.values_list('username', 'pk'))
+
+        self.user = None
+        if options['user']:
+            try:
+                self.user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError('No user named {}'.format(options['user']))
+
+        self.imported = 0
+        self.failed = 0
+        started = time.monotonic()
+        batch = []
+
+        with open(options['path'], newline='', encoding='utf-8') as file:
+            for line_number, row in self.read_rows(file, file_format):
+                itemrequest = self.build(line_number, row)
+                if itemrequest is not None:
+                    batch.append((line_number, itemrequest))
+                if len(batch) >= options['batch_size']:
+                    self.save_batch(batch)
+                    batch = []
+
+        if batch:
+            self.save_batch(batch)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write('Imported {} rows, {} failed, in {:.1f}s ({:.0f} rows/s)'.format(
+            self.imported,
+            self.failed,
+            elapsed,
+            self.imported / elapsed if elapsed else 0,
+        ))
+
+    def read_rows(self, file, file_format):
+        if file_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(file), start=2):
+                yield line_number, row
+            return
+
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                self.error(line_number, 'not valid JSON: {}'.format(e))
+                continue
+            if not isinstance(row, dict):
+                self.error(line_number, 'not a JSON object')
+                continue
+            yield line_number, row
+
+    def build(self, line_number, row):
+        data = {fieldname: value for fieldname, value in row.items() if value not in (None, '')}
+
+        if 'price' in data:
+            data['price_0'] = data.pop('price')
+            data['price_1'] = data.pop('price_currency', 'USD')
+
+        for fieldname in ItemRequestImportForm.Meta.fields:
+            field = ItemRequest._meta.get_field(fieldname)
+            if fieldname not in data and fieldname != 'price' and field.has_default():
+                data[fieldname] = field.get_default()
+
+        form = ItemRequestImportForm(data=data)
+        if not form.is_valid():
+            self.error(line_number, '; '.join(
+                '{}: {}'.format(fieldname, ' '.join(errors)) for fieldname, errors in form.errors.items()
+            ))
+            return None
+
+        itemrequest = form.save(commit=False)
+        itemrequest.resolution_notes = data.get('resolution_notes', '')
+
+        submitted_by = data.get('submitted_by')
+        if submitted_by:
+            if submitted_by not in self.usernames:
+                self.error(line_number, 'submitted_by: no user named {}'.format(submitted_by))
+                return None
+            itemrequest.submitted_by_id = self.usernames[submitted_by]
+
+        itemrequest._import_form = form
+        return itemrequest
+
+    def save_batch(self, batch):
+        itemrequests = [itemrequest for line_number, itemrequest in batch]
+
+        try:
+            with transaction.atomic():
+                ItemRequest.objects.bulk_create(itemrequests)
+                changesets = []
+                for itemrequest in itemrequests:
+                    if itemrequest.pk is not None:
+                        changesets.extend(history_changeset(itemrequest._import_form, 'ItemRequest', itemrequest, self.user))
+                History.objects.bulk_create(changesets)
+                search.index_itemrequests(itemrequests)
+                duplicates.index_itemrequests(itemrequests)
+                budget_deltas = {}
+                for itemrequest in itemrequests:
+                    add_budget_delta(budget_deltas, itemrequest.budget_row(), 1)
+                update_budget_rollups(budget_deltas)
+        except DatabaseError as e:
+            for line_number, itemrequest in batch:
+                self.error(line_number, 'batch not saved: {}'.format(e))
+            return
+
+        self.imported += len(batch)
+        if self.verbosity > 1:
+            self.stdout.write('Saved {} rows through line {}'.format(self.imported, batch[-1][0]))
+
+    def error(self, line_number, message):
+        self.failed += 1
+        self.stderr.write('Line {}: {}'.format(line_number, message))
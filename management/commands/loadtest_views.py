@@ -0,0 +1,102 @@
+import asyncio
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import include, path, reverse
+
+from wishlist.models import ItemRequest
+from wishlist.urls import wishlist_urlpatterns
+
+
+class Command(BaseCommand):
+    help = 'Load tests the sync and async list, detail and lookup views under ASGI and compares their throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='requests per view and variant')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--user', help='username to load test as; defaults to the first superuser')
+        parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+
+        users = get_user_model().objects.filter(username=options['user']) if options['user'] else get_user_model().objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to load test as')
+
+        itemrequest = ItemRequest.objects.order_by('pk').first()
+        if itemrequest is None:
+            raise CommandError('There are no item requests to load test with')
+
+        results = {'requests': options['requests'], 'concurrency': options['concurrency'], 'views': []}
+
+        setup_test_environment()
+        try:
+            for use_async_views in [False, True]:
+                urlconf = SimpleNamespace(urlpatterns=[path('', include((wishlist_urlpatterns(use_async_views), 'wishlist')))])
+                with override_settings(ROOT_URLCONF=urlconf):
+                    clients = [AsyncClient() for number in range(options['concurrency'])]
+                    for client in clients:
+                        client.force_login(user)
+                    for name, url in [
+                        ('list', reverse('wishlist:itemrequest-list')),
+                        ('detail', reverse('wishlist:itemrequest-detail', kwargs={'pk': itemrequest.pk})),
+                        ('lookup', reverse('wishlist:user-lookup') + '?q=' + user.username[:1]),
+                    ]:
+                        result = asyncio.run(self.load(clients, url, options['requests']))
+                        result.update({'view': name, 'variant': 'async' if use_async_views else 'sync'})
+                        results['views'].append(result)
+                        self.stderr.write('{variant} {view}: {requests_per_second:.1f} requests/s, p50 {p50_ms}ms, p95 {p95_ms}ms, {errors} errors'.format(**result))
+        finally:
+            teardown_test_environment()
+
+        throughput = {(result['variant'], result['view']): result['requests_per_second'] for result in results['views']}
+        results['async_speedup'] = {
+            view: round(throughput[('async', view)] / throughput[('sync', view)], 2) if throughput[('sync', view)] else None
+            for variant, view in throughput if variant == 'sync'
+        }
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    async def load(self, clients, url, requests):
+        # Each client keeps one request in flight until the total is reached
+
+        latencies = []
+        errors = 0
+        remaining = requests
+
+        async def worker(client):
+            nonlocal errors, remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(client) for client in clients])
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'url': url,
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 2),
+            'errors': errors,
+        }
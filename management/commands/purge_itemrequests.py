@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from wishlist.models import ItemRequest
+
+
+class Command(BaseCommand):
+    help = 'Permanently deletes item requests that were soft deleted longer ago than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='retention window; defaults to WISHLIST_DELETED_RETENTION_DAYS')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'WISHLIST_DELETED_RETENTION_DAYS', 90)
+        if days < 0:
+            raise CommandError('--days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        before = timezone.now() - timedelta(days=days)
+        expired = ItemRequest.all_objects.using(options['database']).filter(is_deleted=True, deleted_at__lt=before)
+
+        # One short transaction per batch, read through wishlist_ir_deleted_at_idx.
+        # History rows are not keyed to the request and are kept for archive_history.
+        purged = 0
+        while True:
+            pks = list(expired.order_by('deleted_at', 'pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            with transaction.atomic(using=options['database']):
+                ItemRequest.all_objects.using(options['database']).filter(pk__in=pks).delete()
+            purged += len(pks)
+            if options['verbosity'] > 1:
+                self.stdout.write('Purged {} requests'.format(purged))
+
+        self.stdout.write('Purged {} requests deleted before {}'.format(purged, before))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wishlist.models import BudgetRollup, rebuild_budget_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the budget rollups from the item requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        rebuild_budget_rollups(options['database'])
+        self.stdout.write('Rebuilt {} budget buckets'.format(BudgetRollup.objects.using(options['database']).count()))
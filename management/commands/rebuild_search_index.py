@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from wishlist import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the item request full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        backend = search.search_backend(options['database'])
+
+        if backend == 'sqlite':
+            search.rebuild_index(options['database'])
+            self.stdout.write('Rebuilt the SQLite FTS5 index')
+        elif backend == 'postgresql':
+            self.stdout.write('PostgreSQL searches use an expression index that needs no rebuilding')
+        else:
+            self.stdout.write('No search index is available on this database; searches use icontains')
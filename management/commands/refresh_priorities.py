@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wishlist.models import refresh_priorities
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored triage priority of every request; run after changing WISHLIST_PRIORITY_WEIGHTS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        updated = refresh_priorities(batch_size=options['batch_size'], using=options['database'])
+        self.stdout.write('Updated the priority of {} requests'.format(updated))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wishlist.notifications import send_notifications
+
+
+class Command(BaseCommand):
+    help = 'Sends each requester one digest of the pending status changes to their requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='recipients per SMTP connection')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        sent = send_notifications(options['batch_size'])
+        self.stdout.write('Sent {} notification messages'.format(sent))
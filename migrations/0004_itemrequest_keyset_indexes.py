@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0003_auto_20220215_1511'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(fields=['status', 'urgency', 'id'], name='wishlist_ir_status_urg_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(fields=['when', 'id'], name='wishlist_ir_when_id_idx'),
+        ),
+    ]
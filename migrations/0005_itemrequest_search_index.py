@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS wishlist_itemrequest_fts '
+                'USING fts5(description, purpose, notes, resolution_notes)'
+            )
+        except OperationalError:
+            # SQLite was built without FTS5; searches fall back to icontains
+            return
+        schema_editor.execute(
+            'INSERT INTO wishlist_itemrequest_fts (rowid, description, purpose, notes, resolution_notes) '
+            'SELECT id, description, purpose, notes, resolution_notes FROM wishlist_itemrequest'
+        )
+
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX wishlist_ir_search_idx ON wishlist_itemrequest USING gin (("
+            "to_tsvector('english', coalesce(description, '') || ' ' || coalesce(purpose, '') || ' ' "
+            "|| coalesce(notes, '') || ' ' || coalesce(resolution_notes, ''))))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS wishlist_itemrequest_fts')
+
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS wishlist_ir_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0004_itemrequest_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, Sum
+
+
+def populate_budget_rollups(apps, schema_editor):
+    ItemRequest = apps.get_model('wishlist', 'ItemRequest')
+    BudgetRollup = apps.get_model('wishlist', 'BudgetRollup')
+    using = schema_editor.connection.alias
+
+    buckets = ItemRequest.objects.using(using).order_by().values('status', 'urgency', 'price_currency').annotate(
+        bucket_count=Count('pk'),
+        bucket_quantity=Sum('quantity'),
+        bucket_total=Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=models.DecimalField(max_digits=24, decimal_places=2))),
+    )
+
+    BudgetRollup.objects.using(using).bulk_create([
+        BudgetRollup(
+            status=bucket['status'],
+            urgency=bucket['urgency'],
+            currency=bucket['price_currency'],
+            count=bucket['bucket_count'],
+            quantity=bucket['bucket_quantity'] or 0,
+            total=bucket['bucket_total'] or 0
+        )
+        for bucket in buckets
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0005_itemrequest_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.IntegerField(choices=[(1, '1) Under Consideration'), (2, '2) Approved'), (3, '3) Received'), (5, '5) Canceled or Denied')], help_text='The status of the requests in this bucket', verbose_name='Status')),
+                ('urgency', models.IntegerField(choices=[(1, '1) Safety Hazard or Work Stoppage'), (2, '2) Major Work Impediment'), (3, '3) Highly Important Issue'), (4, '4) Moderately Important Issue'), (5, '5) Minor Issue or Suggestion')], help_text='The urgency of the requests in this bucket', verbose_name='Urgency')),
+                ('currency', models.CharField(help_text='The currency of the prices in this bucket', max_length=3, verbose_name='currency')),
+                ('count', models.IntegerField(default=0, help_text='The number of requests in this bucket', verbose_name='count')),
+                ('quantity', models.BigIntegerField(default=0, help_text='The total quantity requested', verbose_name='quantity')),
+                ('total', models.DecimalField(decimal_places=2, default=0, help_text='The total of price times quantity', max_digits=24, verbose_name='total cost')),
+            ],
+            options={
+                'ordering': ['currency', 'status', 'urgency'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgetrollup',
+            constraint=models.UniqueConstraint(fields=('status', 'urgency', 'currency'), name='wishlist_budgetrollup_bucket'),
+        ),
+        migrations.RunPython(populate_budget_rollups, migrations.RunPython.noop),
+    ]
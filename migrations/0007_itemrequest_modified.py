@@ -0,0 +1,18 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0006_budgetrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemrequest',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='When this request was last changed', verbose_name='modified'),
+            preserve_default=False,
+        ),
+    ]
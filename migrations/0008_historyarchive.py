@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0007_itemrequest_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='The day of the archive partition', verbose_name='day')),
+                ('modelname', models.CharField(help_text='The model of the archived history', max_length=50, verbose_name='model')),
+                ('objectid', models.BigIntegerField(blank=True, help_text='The id of the record whose history was archived', null=True, verbose_name='object id')),
+            ],
+            options={
+                'ordering': ['modelname', 'objectid', 'day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='historyarchive',
+            constraint=models.UniqueConstraint(fields=('modelname', 'objectid', 'day'), name='wishlist_historyarchive_partition'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wishlist', '0009_history_object_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.IntegerField(choices=[(1, '1) Under Consideration'), (2, '2) Approved'), (3, '3) Received'), (5, '5) Canceled or Denied')], help_text='The status before the change', verbose_name='old status')),
+                ('new_status', models.IntegerField(choices=[(1, '1) Under Consideration'), (2, '2) Approved'), (3, '3) Received'), (5, '5) Canceled or Denied')], help_text='The status after the change', verbose_name='new status')),
+                ('created', models.DateTimeField(auto_now_add=True, help_text='When the status changed', verbose_name='created')),
+                ('itemrequest', models.ForeignKey(help_text='The request whose status changed', on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='wishlist.itemrequest')),
+                ('recipient', models.ForeignKey(help_text='The user to be notified', on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_notifications', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(help_text='The user who changed the status', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0010_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(help_text='The link that was checked', unique=True, verbose_name='url')),
+                ('status_code', models.IntegerField(blank=True, help_text='The HTTP status of the last check, if there was a response', null=True, verbose_name='status code')),
+                ('ok', models.BooleanField(default=False, help_text='Whether the link answered with a success or redirect status', verbose_name='ok')),
+                ('error', models.CharField(blank=True, help_text='Why the last check failed', max_length=200, verbose_name='error')),
+                ('checked', models.DateTimeField(db_index=True, help_text='When the link was last checked', verbose_name='checked')),
+            ],
+            options={
+                'verbose_name_plural': 'link statuses',
+                'ordering': ['url'],
+            },
+        ),
+    ]
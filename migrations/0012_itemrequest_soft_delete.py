@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0011_linkstatus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemrequest',
+            name='is_deleted',
+            field=models.BooleanField(default=False, help_text='Whether this request has been deleted', verbose_name='deleted'),
+        ),
+        migrations.AddField(
+            model_name='itemrequest',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, help_text='When this request was deleted', null=True, verbose_name='deleted at'),
+        ),
+        migrations.RemoveIndex(
+            model_name='itemrequest',
+            name='wishlist_ir_status_urg_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemrequest',
+            name='wishlist_ir_when_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['status', 'urgency', 'id'], name='wishlist_ir_live_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['when', 'id'], name='wishlist_ir_live_when_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='wishlist_ir_deleted_at_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# A copy of the priority formula as this migration first applied it, so that
+# later changes to wishlist.models do not change what the migration does
+PRIORITY_FIELDS = ['urgency', 'substitutability', 'when', 'price', 'quantity']
+
+PRIORITY_WEIGHTS = {
+    'urgency': 10.0,
+    'substitutability': 2.0,
+    'age': 0.1,
+    'cost': -1.0,
+}
+
+
+def priority_score(row, today, weights):
+    when = row['when']
+    if isinstance(when, datetime):
+        when = when.date()
+    cost = max(float(row['price'] or 0), 0) * max(row['quantity'] or 0, 0)
+
+    return round(
+        weights['urgency'] * (5 - row['urgency'])
+        + weights['substitutability'] * (3 - row['substitutability'])
+        + weights['age'] * max((today - when).days, 0)
+        + weights['cost'] * math.log10(1 + cost),
+        4
+    )
+
+
+def populate_priorities(apps, schema_editor):
+    ItemRequest = apps.get_model('wishlist', 'ItemRequest')
+    using = schema_editor.connection.alias
+    today = timezone.localdate()
+    weights = dict(PRIORITY_WEIGHTS, **getattr(settings, 'WISHLIST_PRIORITY_WEIGHTS', {}))
+
+    batch = []
+    for row in ItemRequest.objects.using(using).values('pk', *PRIORITY_FIELDS).iterator(chunk_size=2000):
+        batch.append(ItemRequest(pk=row['pk'], priority=priority_score(row, today, weights)))
+        if len(batch) >= 2000:
+            ItemRequest.objects.using(using).bulk_update(batch, ['priority'])
+            batch = []
+    if batch:
+        ItemRequest.objects.using(using).bulk_update(batch, ['priority'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0012_itemrequest_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemrequest',
+            name='priority',
+            field=models.FloatField(default=0, help_text='The triage priority computed from urgency, substitutability, age and cost; higher is more pressing', verbose_name='priority'),
+        ),
+        migrations.RunPython(populate_priorities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('status__in', [1, 2])), fields=['-priority', '-id'], name='wishlist_ir_triage_idx'),
+        ),
+    ]
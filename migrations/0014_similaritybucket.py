@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0013_itemrequest_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(help_text='Which band of the signature this is', verbose_name='band')),
+                ('bucket', models.BigIntegerField(help_text='The hash of the signature rows in this band', verbose_name='bucket')),
+                ('itemrequest', models.ForeignKey(help_text='The request this band was computed from', on_delete=django.db.models.deletion.CASCADE, related_name='similarity_buckets', to='wishlist.itemrequest')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='similaritybucket',
+            index=models.Index(fields=['band', 'bucket'], name='wishlist_similarity_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='similaritybucket',
+            constraint=models.UniqueConstraint(fields=('itemrequest', 'band'), name='wishlist_similaritybucket_band'),
+        ),
+    ]
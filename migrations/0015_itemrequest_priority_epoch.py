@@ -0,0 +1,64 @@
+import math
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+# A copy of the priority formula as this migration first applied it, so that
+# later changes to wishlist.models do not change what the migration does. Age
+# now counts from a fixed date instead of today, at half the old weight.
+PRIORITY_FIELDS = ['urgency', 'substitutability', 'when', 'price', 'quantity']
+
+PRIORITY_WEIGHTS = {
+    'urgency': 10.0,
+    'substitutability': 2.0,
+    'age': 0.05,
+    'cost': -1.0,
+}
+
+PRIORITY_EPOCH = date(2000, 1, 1)
+
+
+def priority_score(row, weights):
+    when = row['when']
+    if isinstance(when, datetime):
+        when = when.date()
+    cost = max(float(row['price'] or 0), 0) * max(row['quantity'] or 0, 0)
+
+    return round(
+        weights['urgency'] * (5 - row['urgency'])
+        + weights['substitutability'] * (3 - row['substitutability'])
+        - weights['age'] * (when - PRIORITY_EPOCH).days
+        + weights['cost'] * math.log10(1 + cost),
+        4
+    )
+
+
+def recompute_priorities(apps, schema_editor):
+    # Bumps modified too, since the list's ETag keys on it and the order by
+    # priority changes with the new scores
+    ItemRequest = apps.get_model('wishlist', 'ItemRequest')
+    using = schema_editor.connection.alias
+    weights = dict(PRIORITY_WEIGHTS, **getattr(settings, 'WISHLIST_PRIORITY_WEIGHTS', {}))
+    modified = timezone.now()
+
+    batch = []
+    for row in ItemRequest.objects.using(using).values('pk', *PRIORITY_FIELDS).iterator(chunk_size=2000):
+        batch.append(ItemRequest(pk=row['pk'], priority=priority_score(row, weights), modified=modified))
+        if len(batch) >= 2000:
+            ItemRequest.objects.using(using).bulk_update(batch, ['priority', 'modified'])
+            batch = []
+    if batch:
+        ItemRequest.objects.using(using).bulk_update(batch, ['priority', 'modified'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0014_similaritybucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_priorities, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,130 @@
-from django.db import models
+import logging
+import math
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, Q, Sum, Value, When
 from django.conf import settings
-from datetime import datetime
+from datetime import date, datetime
 from django.apps import apps
 from libtekin.models import Item, Location
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from djmoney.models.fields import MoneyField
 
+logger = logging.getLogger(__name__)
+
+# The statuses still waiting on someone, which the triage queue draws from
+OPEN_STATUSES = [1, 2]
+
+PRIORITY_FIELDS = ['urgency', 'substitutability', 'when', 'price', 'quantity']
+
+PRIORITY_WEIGHTS = {
+    'urgency': 10.0,  # per step from 5) minor issue up to 1) safety hazard
+    'substitutability': 2.0,  # per step from M) many items up to E) exclusive
+    # per day the request was submitted earlier: a step of urgency every 200 days,
+    # so a minor suggestion outranks a new safety hazard after about two years
+    'age': 0.05,
+    'cost': -1.0,  # per power of ten of price times quantity, so cheaper requests rank higher
+}
+
+# Age is counted from this fixed date rather than back from today. Every request
+# ages at the same rate, so the order is the same, and a stored score stays
+# current until the request itself changes.
+PRIORITY_EPOCH = date(2000, 1, 1)
+
+
+def priority_weights():
+    return dict(PRIORITY_WEIGHTS, **getattr(settings, 'WISHLIST_PRIORITY_WEIGHTS', {}))
+
+
+def priority_score(row, weights=None):
+    # The triage priority of a row of PRIORITY_FIELDS values; higher is more
+    # pressing. Costs in different currencies are compared as plain amounts.
+
+    weights = weights or priority_weights()
+
+    when = row['when']
+    if isinstance(when, datetime):
+        when = when.date()
+    price = getattr(row['price'], 'amount', row['price'])
+    cost = max(float(price or 0), 0) * max(row['quantity'] or 0, 0)
+
+    return round(
+        weights['urgency'] * (5 - row['urgency'])
+        + weights['substitutability'] * (3 - row['substitutability'])
+        - weights['age'] * (when - PRIORITY_EPOCH).days
+        + weights['cost'] * math.log10(1 + cost),
+        4
+    )
+
+
+class ItemRequestQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), which keeps the priority current
+        objs = list(objs)
+        weights = priority_weights()
+        for obj in objs:
+            obj.priority = priority_score(obj.priority_row(), weights)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update_with_history(self, user, **values):
+        # Applies the change to every row with one UPDATE and records the history
+        # of all of them with one bulk insert
+
+        with transaction.atomic(using=self.db):
+            old_rows = [
+                row for row in self.select_for_update().values('pk', 'submitted_by', *set(values) | set(BUDGET_FIELDS) | set(PRIORITY_FIELDS))
+                if any(row[fieldname] != value for fieldname, value in values.items())
+            ]
+            if not old_rows:
+                return 0
+
+            updated = self.model._base_manager.using(self.db).filter(pk__in=[row['pk'] for row in old_rows]).update(modified=timezone.now(), **values)
+
+            if set(values) & set(BUDGET_FIELDS):
+                budget_deltas = {}
+                for row in old_rows:
+                    add_budget_delta(budget_deltas, row, -1)
+                    add_budget_delta(budget_deltas, dict(row, **values), 1)
+                update_budget_rollups(budget_deltas, self.db)
+
+            if set(values) & set(PRIORITY_FIELDS):
+                weights = priority_weights()
+                self.model._base_manager.using(self.db).bulk_update(
+                    [self.model(pk=row['pk'], priority=priority_score(dict(row, **values), weights)) for row in old_rows],
+                    ['priority']
+                )
+
+            History.objects.using(self.db).bulk_create([
+                History(
+                    user=user,
+                    modelname=self.model.__name__,
+                    objectid=row['pk'],
+                    fieldname=fieldname,
+                    old_value=str(row[fieldname]),
+                    new_value=str(value)
+                )
+                for row in old_rows for fieldname, value in values.items() if row[fieldname] != value
+            ])
+
+            if 'status' in values:
+                Notification.objects.using(self.db).bulk_create(status_notifications(
+                    [(row['pk'], row['submitted_by'], row['status'], values['status']) for row in old_rows],
+                    user
+                ))
+
+        return updated
+
+
+class LiveItemRequestManager(models.Manager.from_queryset(ItemRequestQuerySet)):
+    # Hides soft deleted requests; ItemRequest.all_objects includes them
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class ItemRequest(models.Model):
     URGENCY_CHOICES = (
         (1, '1) Safety Hazard or Work Stoppage'),
@@ -94,15 +213,76 @@ class ItemRequest(models.Model):
         blank=True,
         help_text='How the problem was resolved'
     )
+    modified = models.DateTimeField(
+        'modified',
+        auto_now=True,
+        db_index=True,
+        help_text='When this request was last changed'
+    )
+    is_deleted = models.BooleanField(
+        'deleted',
+        default=False,
+        help_text='Whether this request has been deleted'
+    )
+    deleted_at = models.DateTimeField(
+        'deleted at',
+        null=True,
+        blank=True,
+        help_text='When this request was deleted'
+    )
+    priority = models.FloatField(
+        'priority',
+        default=0,
+        help_text='The triage priority computed from urgency, substitutability, age and cost; higher is more pressing'
+    )
+
+    objects = LiveItemRequestManager()
+    all_objects = ItemRequestQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self):
         return self.description
 
+    def save(self, *args, **kwargs):
+        self.priority = priority_score(self.priority_row())
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(PRIORITY_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'priority'}
+        super().save(*args, **kwargs)
+
+    def priority_row(self):
+        return {fieldname: getattr(self, fieldname) for fieldname in PRIORITY_FIELDS}
+
+    def budget_row(self):
+        return {
+            'status': self.status,
+            'urgency': self.urgency,
+            'price': self.price.amount if self.price is not None else None,
+            'price_currency': str(self.price_currency),
+            'quantity': self.quantity,
+            'is_deleted': self.is_deleted,
+        }
+
     def user_is_editor(self, user):
-        return user == self.submitted_by or user.has_perm('wishlist.change_itemrequest')
+        # The permission ItemRequestUpdate and the bulk actions require; submitting
+        # a request does not make it editable
+        return user.has_perm('wishlist.change_itemrequest')
 
     class Meta:
         ordering=['status', 'urgency']
+        indexes = [
+            # partial, so the live rows the list reads never share an index with tombstones
+            models.Index(fields=['status', 'urgency', 'id'], condition=Q(is_deleted=False), name='wishlist_ir_live_status_idx'),
+            models.Index(fields=['when', 'id'], condition=Q(is_deleted=False), name='wishlist_ir_live_when_idx'),
+            models.Index(fields=['deleted_at'], condition=Q(is_deleted=True), name='wishlist_ir_deleted_at_idx'),
+            # the triage queue reads the top of this range in order
+            models.Index(fields=['-priority', '-id'], condition=Q(is_deleted=False, status__in=OPEN_STATUSES), name='wishlist_ir_triage_idx'),
+        ]
 
 
 class History(models.Model):
@@ -149,19 +329,376 @@ class History(models.Model):
 
     class Meta:
         ordering = ('-when', 'modelname', 'objectid')
+        indexes = [
+            models.Index(fields=['modelname', 'objectid', 'when', 'id'], name='wishlist_history_object_idx'),
+        ]
 
     def __str__(self):
 
         new_value_trunc = self.new_value[:17:]+'...' if len(self.new_value) > 20 else self.new_value
 
         try:
-            model = apps.get_model('wishlist', self.modelname)
-            object = model.objects.get(pk=self.objectid)
+            object = self._history_object
+        except AttributeError:
+            object = resolve_history_objects([self])[0]._history_object
+
+        if object is not None:
             return f'{self.when.strftime("%Y-%m-%d")}: {self.modelname}: [{object}] [{self.fieldname}] changed to "{new_value_trunc}"'
 
-        except Exception as e:
-            print (e)
+        return f'{self.when.strftime("%Y-%m-%d")}: {self.modelname}: {self.objectid} [{self.fieldname}] changed to "{new_value_trunc}"'
+
+
+def resolve_history_objects(histories):
+    # Attaches the changed object to each History row, fetching every referenced
+    # object with one in_bulk() query per model instead of one query per row
+
+    histories = list(histories)
+
+    objectids_by_modelname = {}
+    for history in histories:
+        if history.objectid is not None:
+            objectids_by_modelname.setdefault(history.modelname, set()).add(history.objectid)
+
+    objects_by_modelname = {}
+    for modelname, objectids in objectids_by_modelname.items():
+        try:
+            model = apps.get_model('wishlist', modelname)
+        except LookupError:
+            logger.warning('History refers to unknown model %s', modelname)
+            continue
+        objects_by_modelname[modelname] = model._base_manager.in_bulk(objectids)
+
+    for history in histories:
+        history._history_object = objects_by_modelname.get(history.modelname, {}).get(history.objectid)
+
+    return histories
+
+
+class HistoryArchive(models.Model):
+    # One row per object per archived day, so that the archive reader opens only
+    # the partitions holding an object's history
+
+    day = models.DateField(
+        'day',
+        help_text='The day of the archive partition'
+    )
+    modelname = models.CharField(
+        'model',
+        max_length=50,
+        help_text='The model of the archived history'
+    )
+    objectid = models.BigIntegerField(
+        'object id',
+        null=True,
+        blank=True,
+        help_text='The id of the record whose history was archived'
+    )
+
+    class Meta:
+        ordering = ['modelname', 'objectid', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['modelname', 'objectid', 'day'], name='wishlist_historyarchive_partition'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}: {self.modelname}: {self.objectid}'
+
+
+class BudgetRollup(models.Model):
+
+    status = models.IntegerField(
+        'Status',
+        choices=ItemRequest.STATUS_CHOICES,
+        help_text='The status of the requests in this bucket'
+    )
+    urgency = models.IntegerField(
+        'Urgency',
+        choices=ItemRequest.URGENCY_CHOICES,
+        help_text='The urgency of the requests in this bucket'
+    )
+    currency = models.CharField(
+        'currency',
+        max_length=3,
+        help_text='The currency of the prices in this bucket'
+    )
+    count = models.IntegerField(
+        'count',
+        default=0,
+        help_text='The number of requests in this bucket'
+    )
+    quantity = models.BigIntegerField(
+        'quantity',
+        default=0,
+        help_text='The total quantity requested'
+    )
+    total = models.DecimalField(
+        'total cost',
+        max_digits=24,
+        decimal_places=2,
+        default=0,
+        help_text='The total of price times quantity'
+    )
+
+    class Meta:
+        ordering = ['currency', 'status', 'urgency']
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'urgency', 'currency'], name='wishlist_budgetrollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_status_display()} / {self.get_urgency_display()} / {self.currency}'
+
+
+class Notification(models.Model):
+    # The outbox of status changes, written in the same transaction as the
+    # change and drained by the send_notifications command
+
+    itemrequest = models.ForeignKey(
+        ItemRequest,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        help_text='The request whose status changed'
+    )
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='wishlist_notifications',
+        help_text='The user to be notified'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        help_text='The user who changed the status'
+    )
+    old_status = models.IntegerField(
+        'old status',
+        choices=ItemRequest.STATUS_CHOICES,
+        help_text='The status before the change'
+    )
+    new_status = models.IntegerField(
+        'new status',
+        choices=ItemRequest.STATUS_CHOICES,
+        help_text='The status after the change'
+    )
+    created = models.DateTimeField(
+        'created',
+        auto_now_add=True,
+        help_text='When the status changed'
+    )
+
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self):
+        return f'{self.recipient}: {self.itemrequest_id} {self.get_old_status_display()} -> {self.get_new_status_display()}'
+
+
+def status_notifications(changes, user):
+    # Unsaved notifications for (itemrequest pk, submitter pk, old status, new
+    # status) changes, skipping requests without a submitter and changes the
+    # submitter made themselves
+
+    return [
+        Notification(
+            itemrequest_id=itemrequest_pk,
+            recipient_id=recipient_pk,
+            user=user,
+            old_status=old_status,
+            new_status=new_status
+        )
+        for itemrequest_pk, recipient_pk, old_status, new_status in changes
+        if recipient_pk is not None and recipient_pk != getattr(user, 'pk', None) and old_status != new_status
+    ]
+
+
+class LinkStatus(models.Model):
+    # The last check of one distinct ItemRequest.link, written by the
+    # check_links command and copied into the cache for the views
+
+    url = models.URLField(
+        'url',
+        unique=True,
+        help_text='The link that was checked'
+    )
+    status_code = models.IntegerField(
+        'status code',
+        null=True,
+        blank=True,
+        help_text='The HTTP status of the last check, if there was a response'
+    )
+    ok = models.BooleanField(
+        'ok',
+        default=False,
+        help_text='Whether the link answered with a success or redirect status'
+    )
+    error = models.CharField(
+        'error',
+        max_length=200,
+        blank=True,
+        help_text='Why the last check failed'
+    )
+    checked = models.DateTimeField(
+        'checked',
+        db_index=True,
+        help_text='When the link was last checked'
+    )
+
+    class Meta:
+        ordering = ['url']
+        verbose_name_plural = 'link statuses'
+
+    def __str__(self):
+        return f'{self.url}: {self.status_code or self.error}'
+
+    def health(self):
+        return {
+            'ok': self.ok,
+            'status_code': self.status_code,
+            'error': self.error,
+            'checked': self.checked,
+        }
+
+
+class SimilarityBucket(models.Model):
+    # One LSH band of the MinHash signature of a request's description and
+    # purpose. Requests sharing a bucket in any band are duplicate candidates;
+    # kept current by the duplicates module.
+
+    itemrequest = models.ForeignKey(
+        ItemRequest,
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets',
+        help_text='The request this band was computed from'
+    )
+    band = models.PositiveSmallIntegerField(
+        'band',
+        help_text='Which band of the signature this is'
+    )
+    bucket = models.BigIntegerField(
+        'bucket',
+        help_text='The hash of the signature rows in this band'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['itemrequest', 'band'], name='wishlist_similaritybucket_band'),
+        ]
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='wishlist_similarity_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.itemrequest_id}: {self.band}/{self.bucket}'
+
+
+BUDGET_FIELDS = ['status', 'urgency', 'price', 'price_currency', 'quantity', 'is_deleted']
+
+
+def add_budget_delta(deltas, row, sign):
+    # Adds (sign = 1) or removes (sign = -1) one request's row of BUDGET_FIELDS
+    # values to the per-bucket deltas. Deleted requests are in no bucket.
+
+    if row['is_deleted']:
+        return
+
+    delta = deltas.setdefault((row['status'], row['urgency'], str(row['price_currency'])), [0, 0, Decimal(0)])
+    delta[0] += sign
+    delta[1] += sign * row['quantity']
+    if row['price'] is not None:
+        delta[2] += sign * row['price'] * row['quantity']
+
+
+def update_budget_rollups(deltas, using='default'):
+    # Applies the deltas in a fixed number of queries however many buckets they
+    # touch: one to find the buckets, one UPDATE for those that exist and one
+    # INSERT for the new ones
+
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    existing = {
+        (status, urgency, currency): pk
+        for pk, status, urgency, currency in BudgetRollup.objects.using(using)
+        .filter(Q(*[Q(status=status, urgency=urgency, currency=currency) for status, urgency, currency in deltas], _connector=Q.OR))
+        .values_list('pk', 'status', 'urgency', 'currency')
+    }
+
+    if existing:
+        increments = {}
+        for index, fieldname in enumerate(['count', 'quantity', 'total']):
+            increments[fieldname] = F(fieldname) + Case(
+                *[When(pk=pk, then=Value(deltas[key][index])) for key, pk in existing.items()],
+                default=Value(0),
+                output_field=BudgetRollup._meta.get_field(fieldname)
+            )
+        BudgetRollup.objects.using(using).filter(pk__in=existing.values()).update(**increments)
+
+    missing = {key: delta for key, delta in deltas.items() if key not in existing}
+    if not missing:
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            BudgetRollup.objects.using(using).bulk_create([
+                BudgetRollup(status=status, urgency=urgency, currency=currency, count=count, quantity=quantity, total=total)
+                for (status, urgency, currency), (count, quantity, total) in missing.items()
+            ])
+    except IntegrityError:
+        # another request created one of the buckets first
+        update_budget_rollups(missing, using)
+
+
+def refresh_priorities(queryset=None, batch_size=1000, using='default'):
+    # Recomputes the stored priority of every live request in pk batches after
+    # WISHLIST_PRIORITY_WEIGHTS changes, writing only the scores that changed.
+    # Bumps modified with them, since the list's ETag and row cache key on it
+    # and the list can be ordered by priority.
+
+    queryset = (ItemRequest.objects.all() if queryset is None else queryset).using(using)
+    weights = priority_weights()
+    modified = timezone.now()
+
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values('pk', 'priority', *PRIORITY_FIELDS)[:batch_size])
+        if not rows:
+            return updated
+
+        changed = []
+        for row in rows:
+            priority = priority_score(row, weights)
+            if priority != row['priority']:
+                changed.append(ItemRequest(pk=row['pk'], priority=priority, modified=modified))
+        if changed:
+            ItemRequest._base_manager.using(using).bulk_update(changed, ['priority', 'modified'])
+
+        updated += len(changed)
+        last_pk = rows[-1]['pk']
+
+
+def rebuild_budget_rollups(using='default'):
 
-        return f'{"mdy".format(self.when.strftime("%Y-%m-%d"))}: {self.modelname}: {self.objectid} [{self.fieldname}] changed to "{new_value_trunc}"'
+    with transaction.atomic(using=using):
+        BudgetRollup.objects.using(using).all().delete()
 
+        buckets = ItemRequest.objects.using(using).order_by().values('status', 'urgency', 'price_currency').annotate(
+            bucket_count=Count('pk'),
+            bucket_quantity=Sum('quantity'),
+            bucket_total=Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=models.DecimalField(max_digits=24, decimal_places=2))),
+        )
 
+        BudgetRollup.objects.using(using).bulk_create([
+            BudgetRollup(
+                status=bucket['status'],
+                urgency=bucket['urgency'],
+                currency=bucket['price_currency'],
+                count=bucket['bucket_count'],
+                quantity=bucket['bucket_quantity'] or 0,
+                total=bucket['bucket_total'] or 0
+            )
+            for bucket in buckets
+        ])
@@ -0,0 +1,102 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+
+from .models import ItemRequest, Notification
+
+logger = logging.getLogger(__name__)
+
+
+def digest_lines(notifications):
+    # One line per request, from its first old status to its last new status,
+    # leaving out requests that ended where they started
+
+    status_labels = dict(ItemRequest.STATUS_CHOICES)
+    base_url = getattr(settings, 'WISHLIST_BASE_URL', '')
+
+    changes = {}
+    for notification in notifications:
+        change = changes.setdefault(notification.itemrequest_id, [notification.itemrequest, notification.old_status, None])
+        change[2] = notification.new_status
+
+    lines = []
+    for itemrequest, old_status, new_status in changes.values():
+        if old_status == new_status:
+            continue
+        lines.append('{}: {} -> {}'.format(itemrequest, status_labels[old_status], status_labels[new_status]))
+        if base_url:
+            lines.append('    ' + base_url.rstrip('/') + reverse('wishlist:itemrequest-detail', kwargs={'pk': itemrequest.pk}))
+
+    return lines
+
+
+def digest_message(recipient, notifications, connection):
+
+    lines = digest_lines(notifications)
+    if not lines:
+        return None
+
+    body = 'The status of your wish list requests has changed:\n\n' + '\n'.join(lines) + '\n'
+    return EmailMessage(
+        subject=getattr(settings, 'WISHLIST_NOTIFICATION_SUBJECT', 'Wish list requests updated'),
+        body=body,
+        from_email=getattr(settings, 'WISHLIST_NOTIFICATION_FROM', None),
+        to=[recipient.email],
+        connection=connection,
+    )
+
+
+def send_notifications(batch_size=100, connection=None):
+    # Drains the outbox in batches of recipients, sending each one a single
+    # digest of all their pending changes over one connection per batch.
+    # A batch is claimed by deleting it in a short transaction, so no lock is
+    # held while talking to the mail server and concurrent runs skip each
+    # other's rows. Notifications for a recipient whose message fails are put
+    # back for the next run.  Returns the number of messages sent.
+
+    sent = 0
+    failed_recipients = set()
+
+    while True:
+        with transaction.atomic():
+            recipient_pks = list(
+                Notification.objects.exclude(recipient_id__in=failed_recipients)
+                .order_by('recipient_id')
+                .values_list('recipient_id', flat=True)
+                .distinct()[:batch_size]
+            )
+            if not recipient_pks:
+                return sent
+
+            notifications = list(
+                Notification.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(recipient_id__in=recipient_pks)
+                .select_related('recipient', 'itemrequest')
+                .order_by('pk')
+            )
+            Notification.objects.filter(pk__in=[notification.pk for notification in notifications]).delete()
+
+        notifications_by_recipient = {}
+        for notification in notifications:
+            notifications_by_recipient.setdefault(notification.recipient, []).append(notification)
+
+        failed = []
+        with (connection or get_connection()) as batch_connection:
+            for recipient, recipient_notifications in notifications_by_recipient.items():
+                message = digest_message(recipient, recipient_notifications, batch_connection) if recipient.email else None
+                if message is None:
+                    continue
+                try:
+                    message.send()
+                except Exception as e:
+                    logger.warning('Could not send wish list notifications to %s: %s', recipient, e)
+                    failed_recipients.add(recipient.pk)
+                    failed.extend(recipient_notifications)
+                    continue
+                sent += 1
+
+        # Under their old pks, so a digest keeps the order of the changes
+        Notification.objects.bulk_create(failed)
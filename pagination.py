@@ -0,0 +1,180 @@
+import base64
+import datetime
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    # Returns the planner's row estimate on PostgreSQL, or None where the backend
+    # has no cheap estimate and the real count has to be used
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    is_estimate = True
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            self.is_estimate = False
+            return super().count
+        return estimate
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page of %s>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes and times to milliseconds, which would
+    # make a seek skip rows that differ only below that
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPaginator:
+    # Seeks to a page with a WHERE on the ordering columns instead of OFFSET, so
+    # every page costs the same as the first. Needs an ordering of non-null local
+    # fields; pk is appended as the tiebreaker, descending if the ordering asks
+    # for -pk so that an index ending in id can be scanned backwards.
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        tiebreaker = '-pk' if any(field in ('-pk', '-id') for field in ordering) else 'pk'
+        self.ordering = [field for field in ordering if field.lstrip('-') not in ('pk', 'id')] + [tiebreaker]
+
+    @cached_property
+    def keys(self):
+        keys = []
+        for name in self.ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = self.queryset.model._meta.pk if name == 'pk' else self.queryset.model._meta.get_field(name)
+            keys.append((name, field, descending))
+        return keys
+
+    @cached_property
+    def is_supported(self):
+        for name in self.ordering:
+            if not isinstance(name, str) or '__' in name or name.lstrip('-') in ('', '?'):
+                return False
+        try:
+            keys = self.keys
+        except Exception:
+            return False
+        return all(field.concrete and not field.null and not field.is_relation for name, field, descending in keys)
+
+    def encode_cursor(self, object):
+        # object may be a model instance or a values() row that includes the keys
+        if isinstance(object, dict):
+            values = [object[name] for name, field, descending in self.keys]
+        else:
+            values = [field.value_from_object(object) for name, field, descending in self.keys]
+        return base64.urlsafe_b64encode(json.dumps(values, cls=CursorEncoder).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if len(values) != len(self.keys):
+                raise ValueError
+            return [field.to_python(value) for (name, field, descending), value in zip(self.keys, values)]
+        except Exception:
+            raise InvalidPage('That cursor is not valid')
+
+    def seek(self, values, backwards):
+        condition = Q()
+        for index, (name, field, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[index]})
+            for (previous_name, previous_field, previous_descending), previous_value in zip(self.keys[:index], values):
+                term &= Q(**{previous_name: previous_value})
+            condition |= term
+        return condition
+
+    def page_queryset(self, after=None, before=None):
+        # The queryset of the page plus one row, to tell whether there is more
+
+        backwards = bool(before) and not after
+        ordering = self.ordering
+        if backwards:
+            ordering = [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+
+        queryset = self.queryset.order_by(*ordering)
+        if after:
+            queryset = queryset.filter(self.seek(self.decode_cursor(after), False))
+        elif before:
+            queryset = queryset.filter(self.seek(self.decode_cursor(before), True))
+
+        return queryset[:self.per_page + 1], backwards
+
+    def page(self, after=None, before=None):
+        queryset, backwards = self.page_queryset(after, before)
+        return self.build_page(list(queryset), after, backwards)
+
+    async def apage(self, after=None, before=None):
+        queryset, backwards = self.page_queryset(after, before)
+        return self.build_page([object async for object in queryset], after, backwards)
+
+    def build_page(self, object_list, after, backwards):
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if backwards:
+            object_list.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        return KeysetPage(
+            object_list,
+            self,
+            self.encode_cursor(object_list[-1]) if has_next and object_list else None,
+            self.encode_cursor(object_list[0]) if has_previous and object_list else None,
+        )
@@ -0,0 +1,170 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import ItemRequest
+
+SEARCH_FIELDS = ['description', 'purpose', 'notes', 'resolution_notes']
+
+SQLITE_TABLE = 'wishlist_itemrequest_fts'
+
+# Must stay identical to the expression indexed by migration 0005 so PostgreSQL
+# can answer searches from the GIN index
+POSTGRESQL_DOCUMENT = (
+    "to_tsvector('english', coalesce(description, '') || ' ' || coalesce(purpose, '') || ' ' "
+    "|| coalesce(notes, '') || ' ' || coalesce(resolution_notes, ''))"
+)
+
+_sqlite_tables = {}
+
+
+def search_backend(using='default'):
+    connection = connections[using]
+
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+
+    if connection.vendor == 'sqlite':
+        if using not in _sqlite_tables:
+            with connection.cursor() as cursor:
+                _sqlite_tables[using] = SQLITE_TABLE in connection.introspection.table_names(cursor)
+        if _sqlite_tables[using]:
+            return 'sqlite'
+
+    return None
+
+
+def forget_search_backend(using='default'):
+    # Called after migrating, which may have created or dropped the SQLite table
+    _sqlite_tables.pop(using, None)
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def search_fields(fieldnames=None):
+    # The SEARCH_FIELDS among fieldnames, or all of them if none of those are chosen
+    return [fieldname for fieldname in SEARCH_FIELDS if fieldname in (fieldnames or [])] or list(SEARCH_FIELDS)
+
+
+def sqlite_match(terms, prefix, fieldnames=None):
+    columns = '{{{}}} : '.format(' '.join(fieldnames)) if fieldnames and len(fieldnames) < len(SEARCH_FIELDS) else ''
+    return ' AND '.join('{}"{}"{}'.format(columns, term, '*' if prefix else '') for term in terms)
+
+
+def postgresql_match(terms, prefix):
+    return ' & '.join('{}{}'.format(term, ':*' if prefix else '') for term in terms)
+
+
+def postgresql_document(fieldnames):
+    return "to_tsvector('english', {})".format(" || ' ' || ".join(f"coalesce({fieldname}, '')" for fieldname in fieldnames))
+
+
+def filter_queryset(queryset, text, prefix=False, fieldnames=None):
+    # Requests containing every word of text somewhere in fieldnames (by default
+    # all SEARCH_FIELDS); with prefix, words also match the start of longer ones
+
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    fieldnames = search_fields(fieldnames)
+
+    backend = search_backend(queryset.db)
+
+    if backend == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s',
+            [sqlite_match(terms, prefix, fieldnames)]
+        ))
+
+    if backend == 'postgresql':
+        match = postgresql_match(terms, prefix)
+        queryset = queryset.filter(RawSQL(f"{POSTGRESQL_DOCUMENT} @@ to_tsquery('english', %s)", [match], output_field=BooleanField()))
+        if len(fieldnames) < len(SEARCH_FIELDS):
+            # The index narrows the rows over all the fields; this keeps those
+            # matching in the chosen ones
+            queryset = queryset.filter(RawSQL(f"{postgresql_document(fieldnames)} @@ to_tsquery('english', %s)", [match], output_field=BooleanField()))
+        return queryset
+
+    return queryset.filter(reduce(or_, [Q(**{f'{fieldname}__icontains': text}) for fieldname in fieldnames]))
+
+
+def ranked_search(queryset, text, limit=10, prefix=True):
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    backend = search_backend(queryset.db)
+
+    if backend == 'sqlite':
+        # bm25 ranking is only available inside the MATCH query, so rank there and
+        # then keep the hits that the queryset allows
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [sqlite_match(terms, prefix), limit * 5]
+            )
+            ranked_pks = [row[0] for row in cursor.fetchall()]
+        objects = queryset.in_bulk(ranked_pks)
+        return [objects[pk] for pk in ranked_pks if pk in objects][:limit]
+
+    if backend == 'postgresql':
+        match = postgresql_match(terms, prefix)
+        return list(filter_queryset(queryset, text, prefix).annotate(
+            search_rank=RawSQL(f"ts_rank({POSTGRESQL_DOCUMENT}, to_tsquery('english', %s))", [match])
+        ).order_by('-search_rank')[:limit])
+
+    return list(filter_queryset(queryset, text)[:limit])
+
+
+def index_itemrequests(itemrequests, using='default'):
+    # Only SQLite needs maintaining by hand; the PostgreSQL index is an expression
+    # index on the table itself
+
+    if search_backend(using) != 'sqlite':
+        return
+
+    itemrequests = [itemrequest for itemrequest in itemrequests if itemrequest.pk is not None]
+    if not itemrequests:
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(itemrequests))})',
+            [itemrequest.pk for itemrequest in itemrequests]
+        )
+        cursor.executemany(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) VALUES (%s, %s, %s, %s, %s)',
+            [[itemrequest.pk] + [getattr(itemrequest, fieldname) for fieldname in SEARCH_FIELDS] for itemrequest in itemrequests]
+        )
+
+
+def unindex_itemrequests(pks, using='default'):
+
+    if search_backend(using) != 'sqlite' or not pks:
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(pks))})',
+            list(pks)
+        )
+
+
+def rebuild_index(using='default'):
+
+    if search_backend(using) != 'sqlite':
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) '
+            f'SELECT id, {", ".join(SEARCH_FIELDS)} FROM {ItemRequest._meta.db_table}'
+        )
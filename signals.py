@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import duplicates, search
+from .models import BUDGET_FIELDS, ItemRequest, add_budget_delta, update_budget_rollups
+
+
+@receiver(post_save, sender=ItemRequest)
+def index_itemrequest(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(search.SEARCH_FIELDS):
+        return
+    search.index_itemrequests([instance], using)
+
+
+@receiver(post_save, sender=ItemRequest)
+def index_itemrequest_similarity(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(duplicates.DUPLICATE_FIELDS):
+        return
+    duplicates.index_itemrequests([instance], using)
+
+
+@receiver(post_delete, sender=ItemRequest)
+def unindex_itemrequest(sender, instance, using='default', **kwargs):
+    search.unindex_itemrequests([instance.pk], using)
+
+
+@receiver(post_delete, sender=ItemRequest)
+def remember_deletion(sender, instance, **kwargs):
+    # Deleted rows leave no modified timestamp behind, so conditional GETs of
+    # the list also compare against the last deletion
+    cache.set('wishlist:itemrequest:deleted', timezone.now(), None)
+
+
+@receiver(pre_save, sender=ItemRequest)
+def remember_budget_row(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    instance._old_budget_row = None
+
+    if raw or instance._state.adding:
+        return
+    if update_fields and not set(update_fields) & set(BUDGET_FIELDS):
+        return
+
+    loaded_values = getattr(instance, '_loaded_values', {})
+    if all(fieldname in loaded_values for fieldname in BUDGET_FIELDS):
+        instance._old_budget_row = {fieldname: loaded_values[fieldname] for fieldname in BUDGET_FIELDS}
+    else:
+        instance._old_budget_row = ItemRequest._base_manager.using(using).filter(pk=instance.pk).values(*BUDGET_FIELDS).first()
+
+
+@receiver(post_save, sender=ItemRequest)
+def update_budget_for_save(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    if raw or (update_fields and not set(update_fields) & set(BUDGET_FIELDS)):
+        return
+
+    budget_row = instance.budget_row()
+    deltas = {}
+    if getattr(instance, '_old_budget_row', None):
+        add_budget_delta(deltas, instance._old_budget_row, -1)
+    add_budget_delta(deltas, budget_row, 1)
+    update_budget_rollups(deltas, using)
+
+    instance._loaded_values = dict(getattr(instance, '_loaded_values', {}), **budget_row)
+
+
+@receiver(post_delete, sender=ItemRequest)
+def update_budget_for_delete(sender, instance, using='default', **kwargs):
+    loaded_values = getattr(instance, '_loaded_values', {})
+    if all(fieldname in loaded_values for fieldname in BUDGET_FIELDS):
+        budget_row = {fieldname: loaded_values[fieldname] for fieldname in BUDGET_FIELDS}
+    else:
+        budget_row = instance.budget_row()
+
+    deltas = {}
+    add_budget_delta(deltas, budget_row, -1)
+    update_budget_rollups(deltas, using)
+
+
+@receiver(post_migrate)
+def forget_search_backend(sender, using='default', **kwargs):
+    search.forget_search_backend(using)
@@ -0,0 +1,35 @@
+function addLookupInput(select) {
+  var input = document.createElement('input')
+  input.type = 'search'
+  input.placeholder = 'Type to search'
+  input.className = 'lookup'
+  select.parentNode.insertBefore(input, select)
+
+  var timer = null
+  input.addEventListener('input', function(e) {
+    clearTimeout(timer)
+    timer = setTimeout(function() {
+      fetch(select.dataset.lookupUrl + '?q=' + encodeURIComponent(input.value.trim()))
+        .then(function(response) { return response.json() })
+        .then(function(data) {
+          for (var option of Array.from(select.options)) {
+            if (!option.selected && option.value !== '') {
+              option.remove()
+            }
+          }
+          var present = Array.from(select.options).map(function(option) { return option.value })
+          for (var result of data.results) {
+            if (present.indexOf(String(result.id)) < 0) {
+              select.add(new Option(result.text, result.id))
+            }
+          }
+        })
+    }, 250)
+  })
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+  for (var select of document.querySelectorAll('select[data-lookup-url]')) {
+    addLookupInput(select)
+  }
+})
@@ -0,0 +1,121 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.base import render_value_in_context
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from ..links import link_health
+
+register = template.Library()
+
+
+def column_value(item, column):
+    value = getattr(item, column['attname'])
+    if column['choices'] is not None:
+        return column['choices'].get(value, value)
+    if column['name'] == 'submitted_by' and value is not None:
+        return item.submitted_by
+    return value
+
+
+def row_version(item, columns):
+    # The modified timestamp when the row was loaded with it, otherwise a digest
+    # of the shown values
+    modified = item.__dict__.get('modified')
+    if modified is not None:
+        return modified.isoformat()
+
+    values = repr([getattr(item, column['attname']) for column in columns])
+    return hashlib.md5(values.encode()).hexdigest()
+
+
+def health_label(health):
+    if health is None:
+        return ''
+    if health['ok']:
+        return 'ok'
+    return 'broken ({})'.format(health['status_code'] or health['error'])
+
+
+def health_version(health):
+    if health is None:
+        return ''
+    return '{}{}@{}'.format('ok' if health['ok'] else 'broken', health['status_code'] or '', int(health['checked'].timestamp()))
+
+
+def render_cell(item, column, context, health):
+    value = render_value_in_context(column_value(item, column), context)
+    if column['name'] == 'link' and health is not None:
+        return format_html(
+            '{} <span class="link-health link-{}" title="checked {}">{}</span>',
+            value,
+            'ok' if health['ok'] else 'broken',
+            health['checked'],
+            health_label(health),
+        )
+    return value
+
+
+def render_row(item, columns, context, health=None, editable=False):
+    cells = format_html_join(
+        '',
+        '<div class="field column">{}</div>',
+        ((render_cell(item, column, context, health),) for column in columns)
+    )
+    edit_link = format_html(' <a href="{}">edit</a>', reverse('wishlist:itemrequest-update', kwargs={'pk': item.pk})) if editable else ''
+    return format_html(
+        '<div class="row"><div class="listfield"><input type="checkbox" name="selected" value="{}" form="form_bulk_update"> <a href="{}">view</a>{}</div>{}</div>',
+        item.pk,
+        reverse('wishlist:itemrequest-detail', kwargs={'pk': item.pk}),
+        edit_link,
+        cells,
+    )
+
+
+@register.simple_tag
+def list_head(columns):
+    return format_html(
+        '<div class="row rowhead"><div class="field"></div>{}</div>',
+        format_html_join('', '<div class="field">{}</div>', ((column['label'],) for column in columns))
+    )
+
+
+@register.simple_tag(takes_context=True)
+def list_rows(context, object_list, columns, editable=False):
+    # Renders every row of the list page in one pass over a precomputed column spec.
+    # Row fragments are cached under the row's pk, a version of its shown values,
+    # the health of its link, which comes from the link checker's cache, and
+    # whether the rows link to the edit form, which is the user's change permission
+
+    object_list = list(object_list)
+    healths = {}
+    if any(column['name'] == 'link' for column in columns):
+        healths = link_health([item.link for item in object_list])
+
+    timeout = getattr(settings, 'WISHLIST_ROW_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return mark_safe(''.join(render_row(item, columns, context, healths.get(item.link) if healths else None, editable) for item in object_list))
+
+    prefix = 'wishlist:row:{}:{}:'.format(get_language(), ','.join(column['name'] for column in columns))
+    keys = [
+        prefix + '{}:{}:{}:{}'.format(item.pk, row_version(item, columns), health_version(healths.get(item.link)) if healths else '', 'e' if editable else '')
+        for item in object_list
+    ]
+    fragments = cache.get_many(keys)
+
+    rendered = {}
+    rows = []
+    for key, item in zip(keys, object_list):
+        if key not in fragments:
+            fragments[key] = rendered[key] = render_row(item, columns, context, healths.get(item.link) if healths else None, editable)
+        rows.append(fragments[key])
+
+    if rendered:
+        cache.set_many(rendered, timeout)
+
+    return mark_safe(''.join(rows))
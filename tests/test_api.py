@@ -0,0 +1,70 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import ItemRequest
+
+
+class ApiListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='reader', password='reader', is_superuser=True)
+        cls.itemrequests = [ItemRequest.objects.create(description=f'item {number}', urgency=number % 3 + 1) for number in range(7)]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username='reader', password='reader')
+        self.url = reverse('wishlist:api-itemrequest-list')
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_fields_limit_the_columns(self):
+        results = self.get(fields='description,price')['results']
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(set(results[0]), {'pk', 'description', 'price', 'price_currency'})
+        self.assertEqual(self.client.get(self.url, {'fields': 'password'}).status_code, 400)
+
+    def test_cursors_walk_both_ways(self):
+        expected = list(ItemRequest.objects.order_by('status', 'urgency', 'pk').values_list('pk', flat=True))
+
+        pages = []
+        page = self.get(page_size=3, fields='description')
+        self.assertIsNone(page['previous'])
+        while True:
+            pages.append([row['pk'] for row in page['results']])
+            if page['next'] is None:
+                break
+            page = self.get(page['next'])
+        self.assertEqual([pk for rows in pages for pk in rows], expected)
+        self.assertEqual([len(rows) for rows in pages], [3, 3, 1])
+
+        backwards = []
+        while page['previous'] is not None:
+            page = self.get(page['previous'])
+            backwards.append([row['pk'] for row in page['results']])
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_bad_paging_is_a_client_error(self):
+        for params in [{'page_size': -5}, {'page_size': 0}, {'page_size': 'ten'}, {'after': 'not-a-cursor'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', json.loads(response.content))
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.itemrequests[0].description = 'item 0, revised'
+        self.itemrequests[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from ..archive import archive_history, compact_partition, object_history, read_partition, write_partition
+from ..models import History, HistoryArchive, ItemRequest
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(
+            username="userone"
+        )
+        cls.itemrequest = ItemRequest.objects.create(description='archived item')
+        cls.other = ItemRequest.objects.create(description='other item')
+        cls.now = timezone.now()
+        for days_ago in [400, 399, 1]:
+            for itemrequest in [cls.itemrequest, cls.other]:
+                history = History.objects.create(
+                    user=cls.user,
+                    modelname='ItemRequest',
+                    objectid=itemrequest.pk,
+                    fieldname='description',
+                    new_value=f'{itemrequest.description} {days_ago}'
+                )
+                History.objects.filter(pk=history.pk).update(when=cls.now - timedelta(days=days_ago))
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_archive_moves_old_rows(self):
+        archived, days = archive_history(self.now - timedelta(days=365), batch_size=3, root=self.root)
+        self.assertEqual(archived, 4)
+        self.assertEqual(len(days), 2)
+        self.assertEqual(History.objects.count(), 2)
+        self.assertEqual(HistoryArchive.objects.filter(objectid=self.itemrequest.pk).count(), 2)
+
+    def test_object_history_includes_archived_rows(self):
+        before = [history.new_value for history in History.objects.filter(objectid=self.itemrequest.pk)]
+        archive_history(self.now - timedelta(days=365), root=self.root)
+        after = [history.new_value for history in object_history('ItemRequest', self.itemrequest.pk, root=self.root)]
+        self.assertEqual(after, before)
+
+    def test_reader_and_compaction_drop_duplicates(self):
+        archived, days = archive_history(self.now - timedelta(days=365), root=self.root)
+        day = sorted(days)[0]
+        rows = list(read_partition(day, self.root))
+        # an interrupted run may append rows that are already archived
+        write_partition(day, rows, self.root)
+        self.assertEqual(len(list(read_partition(day, self.root))), len(rows))
+        self.assertEqual(compact_partition(day, self.root), len(rows))
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from django.test import TestCase
+from djmoney.money import Money
+from ..models import BudgetRollup, ItemRequest, rebuild_budget_rollups
+from django.contrib.auth import get_user_model
+
+class BudgetRollupTests(TestCase):
+
+    def buckets(self):
+        return {
+            (bucket.status, bucket.urgency, bucket.currency): (bucket.count, bucket.quantity, bucket.total)
+            for bucket in BudgetRollup.objects.all() if bucket.count
+        }
+
+    def assertBucketsMatchRebuild(self):
+        incremental = self.buckets()
+        rebuild_budget_rollups()
+        self.assertEqual(incremental, self.buckets())
+
+    def test_rollups_follow_saves_moves_and_deletes(self):
+        monitor = ItemRequest.objects.create(description='Monitor', price=Money('150.00', 'USD'), quantity=2, urgency=2)
+        ItemRequest.objects.create(description='Cables', price=Money('5.00', 'USD'), quantity=10, urgency=2)
+        ItemRequest.objects.create(description='Chair', urgency=4)
+        self.assertEqual(self.buckets()[(1, 2, 'USD')], (2, 12, Decimal('350.00')))
+
+        monitor = ItemRequest.objects.get(pk=monitor.pk)
+        monitor.status = 2
+        monitor.save()
+        self.assertEqual(self.buckets()[(2, 2, 'USD')], (1, 2, Decimal('300.00')))
+        self.assertEqual(self.buckets()[(1, 2, 'USD')], (1, 10, Decimal('50.00')))
+
+        ItemRequest.objects.filter(urgency=2).update_with_history(get_user_model().objects.create(username='committee'), status=3)
+        self.assertEqual(self.buckets()[(3, 2, 'USD')], (2, 12, Decimal('350.00')))
+
+        ItemRequest.objects.get(description='Chair').delete()
+        self.assertNotIn((1, 4, 'USD'), self.buckets())
+        self.assertBucketsMatchRebuild()
+
+    def test_soft_deleted_requests_leave_the_rollups(self):
+        user = get_user_model().objects.create(username='remover')
+        ItemRequest.objects.create(description='Desk', price=Money('200.00', 'USD'), quantity=1, urgency=3)
+        lamp = ItemRequest.objects.create(description='Lamp', price=Money('20.00', 'USD'), quantity=2, urgency=3)
+
+        lamp = ItemRequest.objects.get(pk=lamp.pk)
+        lamp.is_deleted = True
+        lamp.save()
+        self.assertEqual(self.buckets()[(1, 3, 'USD')], (1, 1, Decimal('200.00')))
+        self.assertBucketsMatchRebuild()
+
+        ItemRequest.all_objects.filter(pk=lamp.pk).update_with_history(user, is_deleted=False)
+        self.assertEqual(self.buckets()[(1, 3, 'USD')], (2, 3, Decimal('240.00')))
+        self.assertBucketsMatchRebuild()
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import duplicates
+from ..models import ItemRequest, SimilarityBucket
+
+
+class DuplicateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='admin', password='admin', is_superuser=True)
+        cls.monitor = ItemRequest.objects.create(description='27 inch monitor for the front desk', purpose='Replace the broken monitor')
+        cls.monitor_again = ItemRequest.objects.create(description='27in monitor for front desk', purpose='Replace broken monitor')
+        cls.chair = ItemRequest.objects.create(description='Ergonomic office chair', purpose='Back support')
+        cls.received = ItemRequest.objects.create(description='27 inch monitor for the front desk', purpose='Replace the broken monitor', status=3)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def test_index_follows_saves(self):
+        self.assertEqual(SimilarityBucket.objects.filter(itemrequest=self.chair).count(), duplicates.BANDS)
+
+        self.chair.description = '27 inch monitor for the front desk'
+        self.chair.purpose = 'Replace the broken monitor'
+        self.chair.save()
+
+        self.assertIn(self.chair, duplicates.similar_requests('27 inch monitor for the front desk', 'Replace the broken monitor'))
+
+    def test_similar_requests_are_open_and_ranked(self):
+        similar = duplicates.similar_requests('27 inch monitor for the front desk', 'Replace the broken monitor')
+
+        self.assertEqual(similar, [self.monitor, self.monitor_again])
+        self.assertEqual(similar[0].similarity, 1.0)
+        self.assertEqual(duplicates.similar_requests('Label maker tape'), [])
+
+    def test_create_warns_until_confirmed(self):
+        data = {
+            'description': '27 inch monitor, front desk',
+            'purpose': 'Replace the broken monitor',
+            'quantity': 1,
+            'substitutability': 2,
+            'urgency': 3,
+            'status': 1,
+            'submitted_by': self.user.pk,
+            'when': '2026-10-18',
+        }
+
+        response = self.client.post(reverse('wishlist:itemrequest-create'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.monitor, response.context['similar_requests'])
+        self.assertContains(response, 'Submit Anyway')
+        self.assertEqual(ItemRequest.objects.count(), 4)
+
+        response = self.client.post(reverse('wishlist:itemrequest-create'), dict(data, not_duplicate='1'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ItemRequest.objects.count(), 5)
+
+    def test_cluster_command(self):
+        stdout = StringIO()
+
+        call_command('cluster_duplicates', '--rebuild', stdout=stdout)
+
+        self.assertEqual(duplicates.duplicate_clusters(), [[self.monitor.pk, self.monitor_again.pk]])
+        self.assertIn('Found 1 clusters covering 2 requests', stdout.getvalue())
@@ -0,0 +1,94 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ..forms import ItemRequestForm
+from ..models import History, ItemRequest, resolve_history_objects
+from ..views import update_history
+from django.contrib.auth import get_user_model
+
+class HistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(
+            username="userone"
+        )
+        for number in range(50):
+            itemrequest = ItemRequest.objects.create(
+                description=f'item {number}'
+            )
+            History.objects.create(
+                user=cls.user,
+                modelname='ItemRequest',
+                objectid=itemrequest.pk,
+                fieldname='description',
+                new_value=itemrequest.description
+            )
+
+    def render_page(self, size):
+        with CaptureQueriesContext(connection) as queries:
+            labels = [str(history) for history in resolve_history_objects(History.objects.all()[:size])]
+        return labels, len(queries)
+
+    def test_history_str_includes_object(self):
+        history = History.objects.first()
+        self.assertIn(f'[{ItemRequest.objects.get(pk=history.objectid)}]', history.__str__())
+
+    def test_history_str_for_missing_object(self):
+        history = History.objects.create(
+            modelname='ItemRequest',
+            objectid=0,
+            fieldname='description',
+            new_value='gone'
+        )
+        self.assertIn(': ItemRequest: 0 [description]', history.__str__())
+
+    def test_resolve_history_objects_query_count_is_constant(self):
+        small_labels, small_queries = self.render_page(5)
+        large_labels, large_queries = self.render_page(50)
+        self.assertEqual(len(large_labels), 50)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large_queries, 2)
+
+    def test_update_history_writes_changeset_in_one_query(self):
+        itemrequest = ItemRequest.objects.create(description='changeset item')
+        form = ItemRequestForm(instance=itemrequest, data={
+            'description': 'changed item',
+            'purpose': 'changed purpose',
+            'notes': 'changed notes',
+            'price_0': '',
+            'price_1': 'USD',
+            'quantity': 3,
+            'link': '',
+            'substitutability': 2,
+            'urgency': 1,
+            'status': 1,
+            'submitted_by': self.user.pk,
+            'when': itemrequest.when.strftime('%Y-%m-%d'),
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        with self.assertNumQueries(1):
+            update_history(form, 'ItemRequest', itemrequest, self.user)
+        history = History.objects.get(objectid=itemrequest.pk, fieldname='description')
+        self.assertEqual(history.old_value, 'changeset item')
+        self.assertEqual(
+            History.objects.filter(objectid=itemrequest.pk).count(),
+            len(form.changed_data)
+        )
+
+    def test_update_with_history_is_set_based(self):
+        def approve(pks):
+            with CaptureQueriesContext(connection) as queries:
+                updated = ItemRequest.objects.filter(pk__in=pks).update_with_history(self.user, status=2)
+            return updated, len(queries)
+
+        pks = list(ItemRequest.objects.values_list('pk', flat=True))
+        # the first approval also creates the approved budget rollup buckets
+        approve(pks[:5])
+        small_updated, small_queries = approve(pks[5:10])
+        large_updated, large_queries = approve(pks[10:50])
+        self.assertEqual((small_updated, large_updated), (5, 40))
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(History.objects.filter(fieldname='status', old_value='1', new_value='2').count(), 50)
+        self.assertEqual(approve(pks[:5])[0], 0)
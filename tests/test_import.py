@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import duplicates, search
+from ..models import BudgetRollup, History, ItemRequest, SimilarityBucket
+
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='importer')
+        cls.clerk = get_user_model().objects.create_user(username='clerk')
+
+    def import_lines(self, lines, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, file.name)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_itemrequests', file.name, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_saves_valid_rows_and_reports_bad_ones(self):
+        stdout, stderr = self.import_lines([
+            json.dumps({'description': 'Widescreen monitor', 'purpose': 'Reference desk', 'price': '150.00', 'quantity': 2, 'urgency': 2, 'when': '2026-10-01', 'submitted_by': 'clerk'}),
+            json.dumps({'description': 'Office chair', 'urgency': 2, 'when': '2026-10-02'}),
+            '{"description": "Stapler"',
+            json.dumps({'description': 'Desk lamp', 'urgency': 9, 'when': '2026-10-03'}),
+            json.dumps({'description': 'Bookcart', 'when': '2026-10-04', 'submitted_by': 'nobody'}),
+        ], '--user', 'importer', '--batch-size', '1')
+
+        self.assertIn('Imported 2 rows, 3 failed', stdout)
+        self.assertIn('Line 3: not valid JSON', stderr)
+        self.assertIn('Line 4: urgency:', stderr)
+        self.assertIn('Line 5: submitted_by: no user named nobody', stderr)
+
+        monitor = ItemRequest.objects.get(description='Widescreen monitor')
+        self.assertEqual(monitor.submitted_by, self.clerk)
+        self.assertEqual(monitor.price.amount, Decimal('150.00'))
+        self.assertEqual(set(ItemRequest.objects.values_list('description', flat=True)), {'Widescreen monitor', 'Office chair'})
+
+        history = History.objects.filter(objectid=monitor.pk)
+        self.assertEqual(history.get(fieldname='description').new_value, 'Widescreen monitor')
+        self.assertEqual(set(history.values_list('user', flat=True)), {self.user.pk})
+
+        bucket = BudgetRollup.objects.get(status=1, urgency=2, currency='USD')
+        self.assertEqual((bucket.count, bucket.quantity, bucket.total), (2, 3, Decimal('300.00')))
+
+        self.assertEqual(list(search.filter_queryset(ItemRequest.objects.all(), 'reference')), [monitor])
+        self.assertEqual(SimilarityBucket.objects.filter(itemrequest=monitor).count(), duplicates.BANDS)
+
+    def test_unknown_author_is_an_error(self):
+        with self.assertRaisesMessage(CommandError, 'No user named ghost'):
+            self.import_lines([json.dumps({'description': 'Desk'})], '--user', 'ghost')
+        self.assertFalse(ItemRequest.objects.exists())
@@ -0,0 +1,70 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import instrumentation
+from ..models import ItemRequest
+from ..views import ItemRequestDetail
+
+
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user(username='staff', password='staff', is_staff=True, is_superuser=True)
+        cls.itemrequest = ItemRequest.objects.create(description='Measured request')
+
+    def setUp(self):
+        instrumentation.view_samples.clear()
+
+    def tearDown(self):
+        instrumentation.view_samples.clear()
+
+    def test_recorder_counts_and_keeps_the_slowest(self):
+        recorder = instrumentation.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for number in range(8):
+                list(ItemRequest.objects.filter(pk=number))
+
+        self.assertEqual(recorder.count, 8)
+        self.assertEqual(len(recorder.slowest), instrumentation.SLOWEST_STATEMENTS)
+        self.assertGreater(recorder.seconds, 0)
+
+    def test_percentiles(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(
+            [instrumentation.percentile(values, fraction) for fraction in (0.5, 0.9, 0.99)],
+            [51, 91, 100]
+        )
+        self.assertIsNone(instrumentation.percentile([], 0.5))
+
+    def test_view_sample_records_its_queries(self):
+        request = RequestFactory().get('/')
+        request.user = self.staff
+        with CaptureQueriesContext(connection) as queries:
+            ItemRequestDetail.as_view()(request, pk=self.itemrequest.pk)
+
+        sample = instrumentation.view_samples['ItemRequestDetail'][-1]
+        self.assertEqual(sample['status'], 200)
+        self.assertEqual(sample['queries'], len(queries))
+        self.assertIsNotNone(sample['render_ms'])
+
+        stats = instrumentation.view_stats()['views']['ItemRequestDetail']
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(stats['queries']['p50'], len(queries))
+
+    def test_stats_are_staff_only(self):
+        client = Client()
+        client.login(username='staff', password='staff')
+        client.get(reverse('wishlist:itemrequest-detail', kwargs={'pk': self.itemrequest.pk}))
+
+        stats = json.loads(client.get(reverse('wishlist:view-stats')).content)
+        self.assertEqual(stats['views']['ItemRequestDetail']['requests'], 1)
+
+        get_user_model().objects.create_user(username='member', password='member', is_superuser=True)
+        client.login(username='member', password='member')
+        self.assertEqual(client.get(reverse('wishlist:view-stats')).status_code, 403)
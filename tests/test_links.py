@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..links import LinkChecker, PrivateAddressError, PublicHTTPConnection, is_public_address, link_health
+from ..models import ItemRequest, LinkStatus
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = {}
+
+    def respond(self, body):
+        StubHandler.hits[self.path] = StubHandler.hits.get(self.path, 0) + 1
+        status = {
+            '/ok': 200,
+            '/missing': 404,
+            '/nohead': 405 if self.command == 'HEAD' else 200,
+            '/busy': 503 if StubHandler.hits[self.path] == 1 else 200,
+        }.get(self.path, 404)
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.respond(b'')
+
+    def do_GET(self):
+        self.respond(b'stub page')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServerMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+
+# The stub server listens on the loopback address, which is refused by default
+@override_settings(WISHLIST_LINK_ALLOW_PRIVATE=True)
+class LinkCheckTests(StubServerMixin, TestCase):
+
+    def setUp(self):
+        StubHandler.hits.clear()
+        cache.clear()
+
+    def test_checker_statuses_and_retries(self):
+        urls = [self.base_url + path for path in ['/ok', '/missing', '/nohead', '/busy']]
+        checker = LinkChecker(per_host_rate=0, backoff=0, timeout=5)
+        results = asyncio.run(checker.check_all(urls + ['ftp://example.com/file']))
+        self.assertEqual(results[self.base_url + '/ok'], (200, ''))
+        self.assertEqual(results[self.base_url + '/missing'], (404, ''))
+        self.assertEqual(results[self.base_url + '/nohead'], (200, ''))
+        self.assertEqual(results[self.base_url + '/busy'], (200, ''))
+        self.assertIsNone(results['ftp://example.com/file'][0])
+
+    def test_unreachable_link_is_an_error(self):
+        checker = LinkChecker(retries=1, backoff=0, timeout=2)
+        url = 'http://127.0.0.1:1/'
+        status_code, error = asyncio.run(checker.check_all([url]))[url]
+        self.assertIsNone(status_code)
+        self.assertTrue(error)
+
+    def test_command_caches_health_and_respects_ttl(self):
+        for path in ['/ok', '/missing', '/ok']:
+            ItemRequest.objects.create(description=path, link=self.base_url + path)
+
+        call_command('check_links', '--rate', '0', '--backoff', '0', stdout=StringIO())
+        self.assertEqual(LinkStatus.objects.count(), 2)
+        self.assertEqual(StubHandler.hits['/ok'], 1)
+
+        health = link_health([self.base_url + '/ok', self.base_url + '/missing', self.base_url + '/unchecked'])
+        self.assertTrue(health[self.base_url + '/ok']['ok'])
+        self.assertEqual(health[self.base_url + '/missing']['status_code'], 404)
+        self.assertNotIn(self.base_url + '/unchecked', health)
+
+        call_command('check_links', stdout=StringIO())
+        self.assertEqual(StubHandler.hits['/ok'], 1)
+
+    def test_check_changes_page_etag(self):
+        itemrequest = ItemRequest.objects.create(description='linked', link=self.base_url + '/missing')
+        get_user_model().objects.create_superuser('linkadmin', 'linkadmin@example.com', 'linkadmin')
+        client = Client()
+        client.login(username='linkadmin', password='linkadmin')
+        url = reverse('wishlist:itemrequest-detail', kwargs={'pk': itemrequest.pk})
+        etag = client.get(url)['ETag']
+
+        call_command('check_links', '--rate', '0', '--backoff', '0', stdout=StringIO())
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'link-broken')
+
+
+class LinkSafetyTests(StubServerMixin, TestCase):
+
+    def setUp(self):
+        StubHandler.hits.clear()
+
+    def test_public_addresses(self):
+        for address in ['127.0.0.1', '10.1.2.3', '192.168.0.1', '169.254.169.254', '0.0.0.0', '224.0.0.1', '::1', 'fe80::1%eth0', '::ffff:127.0.0.1']:
+            self.assertFalse(is_public_address(address), address)
+        for address in ['93.184.216.34', '2606:4700:4700::1111']:
+            self.assertTrue(is_public_address(address), address)
+
+    def test_private_links_are_refused(self):
+        urls = [self.base_url + '/ok', 'http://localhost:{}/ok'.format(self.server.server_address[1]), 'file:///etc/passwd']
+        results = asyncio.run(LinkChecker(per_host_rate=0, backoff=0, timeout=2).check_all(urls))
+
+        self.assertEqual(results[urls[0]], (None, 'Refused a private or local address'))
+        self.assertEqual(results[urls[1]], (None, 'Refused a private or local address'))
+        self.assertIsNone(results[urls[2]][0])
+        self.assertEqual(StubHandler.hits, {})
+
+    def test_connection_checks_the_address_it_reached(self):
+        connection = PublicHTTPConnection('127.0.0.1', self.server.server_address[1], timeout=2)
+        with self.assertRaises(PrivateAddressError):
+            connection.request('GET', '/ok')
+        self.assertEqual(StubHandler.hits, {})
@@ -0,0 +1,177 @@
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from ..links import cache_link_statuses
+from ..models import History, ItemRequest, LinkStatus
+from ..pagination import KeysetPaginator
+from ..views import itemrequest_column_spec, project_itemrequest_columns
+from django.contrib.auth import get_user_model
+from tougshire_vistas.models import Vista
+
+class ListQueryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ItemRequest.objects.bulk_create([
+            ItemRequest(
+                description=f'item {number}',
+                notes='a long note ' * 50,
+                submitted_by=get_user_model().objects.create(username=f'user{number}')
+            ) for number in range(100)
+        ])
+
+    def test_list_page_of_100_rows_is_one_query(self):
+        queryset = project_itemrequest_columns(ItemRequest.objects.all(), ['description', 'submitted_by', 'price'])
+        with self.assertNumQueries(1):
+            rows = [(item.description, str(item.submitted_by), item.price) for item in queryset[:100]]
+        self.assertEqual(len(rows), 100)
+
+    @override_settings(WISHLIST_ROW_CACHE_TIMEOUT=0)
+    def test_list_view_queries_do_not_grow_with_rows(self):
+        client = Client()
+        client.force_login(get_user_model().objects.create_superuser('listadmin', 'listadmin@example.com', None))
+        url = reverse('wishlist:itemrequest-list')
+        client.get(url)
+
+        counts = {}
+        for page, rows in [(1, 30), (4, 10)]:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url, {'page': page})
+            self.assertEqual(len(response.context['object_list']), rows)
+            self.assertContains(response, 'class="row"', count=rows)
+            counts[page] = len(queries)
+        self.assertEqual(counts[1], counts[4])
+
+    def test_hidden_text_columns_are_deferred(self):
+        item = project_itemrequest_columns(ItemRequest.objects.all(), ['description', 'status']).first()
+        self.assertIn('notes', item.get_deferred_fields())
+        self.assertIn('resolution_notes', item.get_deferred_fields())
+        self.assertNotIn('description', item.get_deferred_fields())
+
+    def test_keyset_pages_match_offset_order(self):
+        ItemRequest.objects.filter(pk__in=ItemRequest.objects.values('pk')[:40]).update(status=2, urgency=1)
+        expected = list(ItemRequest.objects.order_by('status', 'urgency', 'pk').values_list('pk', flat=True))
+        paginator = KeysetPaginator(ItemRequest.objects.all(), 30, ['status', 'urgency'])
+        self.assertTrue(paginator.is_supported)
+
+        seen = []
+        page = paginator.page()
+        while True:
+            seen.extend(item.pk for item in page)
+            if not page.has_next():
+                break
+            with self.assertNumQueries(1):
+                page = paginator.page(after=page.next_cursor)
+        self.assertEqual(seen, expected)
+
+        previous = paginator.page(before=page.previous_cursor)
+        self.assertEqual([item.pk for item in previous], expected[60:90])
+
+    def test_keyset_is_not_supported_for_nullable_ordering(self):
+        self.assertFalse(KeysetPaginator(ItemRequest.objects.all(), 30, ['-price']).is_supported)
+
+    def test_keyset_cursor_keeps_microseconds(self):
+        paginator = KeysetPaginator(History.objects.all(), 5, ['-when', '-pk'])
+        when = timezone.now().replace(microsecond=123456)
+        self.assertEqual(paginator.decode_cursor(paginator.encode_cursor({'when': when, 'pk': 7})), [when, 7])
+
+
+class VistaCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('vistaadmin', 'vistaadmin@example.com', None)
+        cls.monitor = ItemRequest.objects.create(description='Widescreen monitor')
+        cls.chair = ItemRequest.objects.create(description='Office chair')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('wishlist:itemrequest-list')
+
+    def tearDown(self):
+        cache.clear()
+
+    def list(self, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data) if data else self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        read_vistas = any(Vista._meta.db_table in query['sql'] for query in queries)
+        return set(response.context['object_list']), read_vistas
+
+    def test_list_reuses_the_cached_vista(self):
+        self.assertEqual(self.list({'vista_query_submitted': '1', 'combined_text_search': 'monitor'}), ({self.monitor}, True))
+        self.assertEqual(self.list(), ({self.monitor}, False))
+        self.assertEqual(self.list(), ({self.monitor}, False))
+
+    def test_new_vista_replaces_the_cached_one(self):
+        self.list({'vista_query_submitted': '1', 'combined_text_search': 'monitor'})
+        self.list({'vista_query_submitted': '1', 'combined_text_search': 'chair'})
+        self.assertEqual(self.list(), ({self.chair}, False))
+
+    def test_deleting_a_vista_drops_the_cached_one(self):
+        self.list({'vista_query_submitted': '1', 'combined_text_search': 'monitor', 'vista__name': 'monitors'})
+        self.assertFalse(self.list()[1])
+
+        self.assertTrue(self.list({'delete_vista': 'delete', 'vista__name': 'monitors'})[1])
+        self.assertFalse(self.list()[1])
+
+
+class RowCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.monitor = ItemRequest.objects.create(description='Widescreen monitor', link='https://example.com/monitor')
+        cls.chair = ItemRequest.objects.create(description='Office chair')
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def render(self, editable=False):
+        columns = itemrequest_column_spec(['description', 'link'])
+        items = project_itemrequest_columns(ItemRequest.objects.order_by('pk'), ['description', 'link'], ['modified'])
+        return Template('{% load itemrequest_list %}{% list_rows items columns editable %}').render(Context({'items': items, 'columns': columns, 'editable': editable}))
+
+    def check_link(self, status_code):
+        cache_link_statuses([LinkStatus(url=self.monitor.link, status_code=status_code, ok=status_code < 400, checked=timezone.now())])
+
+    def test_unchanged_rows_reuse_the_cached_html(self):
+        self.render()
+        # changed behind the cache's back, so only a fresh render would show it
+        ItemRequest.objects.filter(pk=self.chair.pk).update(description='Standing desk')
+
+        html = self.render()
+        self.assertIn('Office chair', html)
+        self.assertNotIn('Standing desk', html)
+
+    def test_modified_row_is_rendered_again(self):
+        self.render()
+        self.chair.description = 'Standing desk'
+        self.chair.save()
+
+        html = self.render()
+        self.assertIn('Standing desk', html)
+        self.assertIn('Widescreen monitor', html)
+
+    def test_changed_link_health_is_rendered_again(self):
+        self.check_link(200)
+        self.assertIn('link-ok', self.render())
+
+        self.check_link(404)
+        html = self.render()
+        self.assertIn('broken (404)', html)
+        self.assertNotIn('link-ok', html)
+
+    def test_edit_links_follow_the_change_permission(self):
+        edit_url = reverse('wishlist:itemrequest-update', kwargs={'pk': self.chair.pk})
+        self.assertNotIn(edit_url, self.render())
+        self.assertIn(edit_url, self.render(editable=True))
+        self.assertNotIn(edit_url, self.render())
@@ -0,0 +1,64 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..forms import ItemRequestForm
+from ..models import ItemRequest
+
+
+class UserLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='viewer', password='viewer')
+        cls.user.user_permissions.add(Permission.objects.get(codename='view_itemrequest'))
+        get_user_model().objects.bulk_create([get_user_model()(username=f'lookup{number:02}') for number in range(25)])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='viewer', password='viewer')
+
+    def lookup(self, **params):
+        response = self.client.get(reverse('wishlist:user-lookup'), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_lookup_pages_by_prefix(self):
+        first = self.lookup(q='lookup')
+        self.assertEqual([result['text'] for result in first['results']], [f'lookup{number:02}' for number in range(20)])
+        self.assertTrue(first['more'])
+
+        second = self.lookup(q='lookup', page=2)
+        self.assertEqual([result['text'] for result in second['results']], [f'lookup{number:02}' for number in range(20, 25)])
+        self.assertFalse(second['more'])
+
+    def test_lookup_filters_on_the_term(self):
+        results = self.lookup(q='lookup1')['results']
+        self.assertEqual([result['text'] for result in results], [f'lookup{number}' for number in range(10, 20)])
+        self.assertEqual(self.lookup(q='nobody')['results'], [])
+
+    def test_lookup_needs_view_permission(self):
+        get_user_model().objects.create_user(username='stranger', password='stranger')
+        client = Client()
+        client.login(username='stranger', password='stranger')
+        self.assertEqual(client.get(reverse('wishlist:user-lookup'), {'q': 'lookup'}).status_code, 403)
+
+
+class LookupSelectTests(TestCase):
+
+    def test_widget_renders_only_the_selected_user(self):
+        get_user_model().objects.bulk_create([get_user_model()(username=f'widget{number}') for number in range(5)])
+        chosen = get_user_model().objects.get(username='widget3')
+        itemrequest = ItemRequest.objects.create(description='widget request', submitted_by=chosen)
+
+        html = str(ItemRequestForm(instance=itemrequest)['submitted_by'])
+
+        self.assertIn(f'data-lookup-url="{reverse("wishlist:user-lookup")}"', html)
+        self.assertIn(f'<option value="{chosen.pk}" selected>widget3</option>', html)
+        self.assertEqual(html.count('<option'), 2)
+        self.assertNotIn('widget1', html)
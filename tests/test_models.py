@@ -1,27 +1,31 @@
 from django.test import TestCase
-from ..models import Project, StatusUpdate
+from ..models import ItemRequest
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
 
-class ProjectTests(TestCase):
+class ItemRequestTests(TestCase):
 
     @classmethod
     def setUpTestData(cls):
         cls.user_one = get_user_model().objects.create(
             username="userone"
         )
-        cls.project_one = Project.objects.create(
-            name="project one"
+        cls.user_two = get_user_model().objects.create(
+            username="usertwo"
         )
-        cls.statusupdate_one = StatusUpdate.objects.create(
-            project = cls.project_one,
-            text = 'Update to Project One'
+        cls.itemrequest_one = ItemRequest.objects.create(
+            description="item request one",
+            submitted_by=cls.user_one
         )
 
-    def test_project_str_is_name(self):
-        self.assertEqual(self.project_one.__str__(), self.project_one.name)
+    def test_itemrequest_str_is_description(self):
+        self.assertEqual(self.itemrequest_one.__str__(), self.itemrequest_one.description)
 
-    def test_statsupdate_str_is_project_name_and_date(self):
-        self.assertEqual(self.statusupdate_one.__str__(), f'{self.project_one} / {self.statusupdate_one.when}')
+    def test_editor_needs_change_permission(self):
+        # as ItemRequestUpdate does, even for the submitter
+        self.assertFalse(self.itemrequest_one.user_is_editor(self.user_one))
+        self.user_two.user_permissions.add(Permission.objects.get(codename='change_itemrequest'))
+        self.assertTrue(self.itemrequest_one.user_is_editor(get_user_model().objects.get(pk=self.user_two.pk)))
 
-    def test_statusupdate_is_in_project_statusupdate_set(self):
-        self.assertEqual(self.project_one.statusupdate_set.count(), 1)
+    def test_itemrequest_is_in_submitter_set(self):
+        self.assertEqual(ItemRequest.objects.filter(submitted_by=self.user_one).count(), 1)
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import ItemRequest, Notification
+from ..notifications import send_notifications
+
+
+class OutboxCheckingBackend(BaseEmailBackend):
+    # Records how many notifications are still queued when each message goes out
+
+    def __init__(self, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.fail = fail
+        self.queued = []
+
+    def send_messages(self, messages):
+        self.queued.append(Notification.objects.count())
+        if self.fail:
+            raise ConnectionError('mail server unavailable')
+        return len(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class NotificationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.approver = get_user_model().objects.create(username='approver')
+        cls.requester = get_user_model().objects.create(username='requester', email='requester@example.com')
+        cls.silent = get_user_model().objects.create(username='silent')
+        cls.itemrequests = [
+            ItemRequest.objects.create(description=f'item {number}', submitted_by=cls.requester)
+            for number in range(3)
+        ]
+        cls.unheard = ItemRequest.objects.create(description='no email', submitted_by=cls.silent)
+
+    def test_update_with_history_queues_notifications(self):
+        ItemRequest.objects.filter(pk__in=[self.itemrequests[0].pk, self.unheard.pk]).update_with_history(self.approver, status=2)
+        self.assertEqual(Notification.objects.count(), 2)
+        ItemRequest.objects.filter(pk=self.itemrequests[1].pk).update_with_history(self.requester, status=2)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_update_form_queues_notification(self):
+        get_user_model().objects.create_superuser('formapprover', 'formapprover@example.com', 'formapprover')
+        client = Client()
+        client.login(username='formapprover', password='formapprover')
+        itemrequest = self.itemrequests[0]
+
+        response = client.post(reverse('wishlist:itemrequest-update', kwargs={'pk': itemrequest.pk}), {
+            'description': itemrequest.description,
+            'price_1': 'USD',
+            'quantity': itemrequest.quantity,
+            'substitutability': itemrequest.substitutability,
+            'urgency': itemrequest.urgency,
+            'status': 2,
+            'submitted_by': self.requester.pk,
+            'when': itemrequest.when.strftime('%Y-%m-%d'),
+        })
+
+        self.assertEqual(response.status_code, 302)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.itemrequest, notification.old_status, notification.new_status), (itemrequest, 1, 2))
+
+    def test_changes_are_sent_as_one_digest_per_recipient(self):
+        ItemRequest.objects.filter(pk__in=[self.itemrequests[0].pk, self.itemrequests[1].pk]).update_with_history(self.approver, status=2)
+        ItemRequest.objects.filter(pk=self.itemrequests[0].pk).update_with_history(self.approver, status=3)
+        ItemRequest.objects.filter(pk=self.unheard.pk).update_with_history(self.approver, status=2)
+
+        self.assertEqual(send_notifications(batch_size=1), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['requester@example.com'])
+        self.assertIn('item 0: 1) Under Consideration -> 3) Received', mail.outbox[0].body)
+        self.assertIn('item 1: 1) Under Consideration -> 2) Approved', mail.outbox[0].body)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_change_and_change_back_sends_nothing(self):
+        ItemRequest.objects.filter(pk=self.itemrequests[2].pk).update_with_history(self.approver, status=2)
+        ItemRequest.objects.filter(pk=self.itemrequests[2].pk).update_with_history(self.approver, status=1)
+        self.assertEqual(send_notifications(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_notifications_are_claimed_before_sending(self):
+        ItemRequest.objects.filter(pk=self.itemrequests[0].pk).update_with_history(self.approver, status=2)
+        backend = OutboxCheckingBackend()
+
+        self.assertEqual(send_notifications(connection=backend), 1)
+        self.assertEqual(backend.queued, [0])
+
+    def test_failed_digest_is_kept_for_the_next_run(self):
+        ItemRequest.objects.filter(pk__in=[self.itemrequests[0].pk, self.itemrequests[1].pk]).update_with_history(self.approver, status=2)
+        queued = list(Notification.objects.order_by('pk').values_list('pk', 'itemrequest', 'new_status'))
+
+        self.assertEqual(send_notifications(connection=OutboxCheckingBackend(fail=True)), 0)
+        self.assertEqual(list(Notification.objects.order_by('pk').values_list('pk', 'itemrequest', 'new_status')), queued)
+
+        self.assertEqual(send_notifications(), 1)
+        self.assertFalse(Notification.objects.exists())
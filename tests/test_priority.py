@@ -0,0 +1,69 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from djmoney.money import Money
+
+from ..models import PRIORITY_WEIGHTS, ItemRequest, priority_score
+
+
+class PriorityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='admin', password='admin', is_superuser=True)
+        cls.hazard = ItemRequest.objects.create(description='Safety Hazard', urgency=1, status=1)
+        cls.minor = ItemRequest.objects.create(description='Minor Issue', urgency=5, status=1)
+        cls.closed = ItemRequest.objects.create(description='Closed Hazard', urgency=1, status=5)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def test_priority_follows_writes(self):
+        self.assertGreater(ItemRequest.objects.get(pk=self.hazard.pk).priority, ItemRequest.objects.get(pk=self.minor.pk).priority)
+
+        ItemRequest.objects.filter(pk=self.minor.pk).update_with_history(self.user, urgency=1)
+        self.assertEqual(
+            ItemRequest.objects.get(pk=self.minor.pk).priority,
+            ItemRequest.objects.get(pk=self.hazard.pk).priority
+        )
+
+    def test_negative_price_costs_nothing(self):
+        itemrequest = ItemRequest.objects.create(description='Refund', price=Money(-5, 'USD'))
+        self.assertEqual(itemrequest.priority, priority_score(dict(itemrequest.priority_row(), price=None)))
+
+    def test_older_requests_rank_higher_without_refreshing(self):
+        ItemRequest.objects.filter(pk=self.minor.pk).update(when=timezone.localdate() - timedelta(days=30))
+        older = ItemRequest.objects.get(pk=self.minor.pk)
+        older.save()
+        newer = ItemRequest.objects.create(description='Minor Issue Again', urgency=5, status=1)
+
+        self.assertAlmostEqual(older.priority - newer.priority, 30 * PRIORITY_WEIGHTS['age'])
+        # scores do not depend on the day they are computed, so nothing goes stale
+        call_command('refresh_priorities', stdout=StringIO())
+        self.assertEqual(ItemRequest.objects.get(pk=self.minor.pk).priority, older.priority)
+
+    def test_refresh_applies_new_weights(self):
+        modified = ItemRequest.objects.get(pk=self.hazard.pk).modified
+        stdout = StringIO()
+
+        call_command('refresh_priorities', stdout=stdout)
+        self.assertIn('Updated the priority of 0 requests', stdout.getvalue())
+
+        with self.settings(WISHLIST_PRIORITY_WEIGHTS={'urgency': 20.0}):
+            call_command('refresh_priorities', stdout=stdout)
+            hazard = ItemRequest.objects.get(pk=self.hazard.pk)
+            self.assertEqual(hazard.priority, priority_score(hazard.priority_row()))
+        self.assertGreater(hazard.modified, modified)
+
+    def test_triage_lists_open_requests_by_priority(self):
+        response = self.client.get(reverse('wishlist:itemrequest-triage'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['object_list']), [self.hazard, self.minor])
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from .. import search
+from ..models import ItemRequest
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.monitor = ItemRequest.objects.create(description='Widescreen monitor', purpose='Reference desk')
+        cls.stapler = ItemRequest.objects.create(description='Stapler', notes='Heavy duty, for the monitor room')
+        cls.chair = ItemRequest.objects.create(description='Chair')
+
+    def tearDown(self):
+        # the list caches the vista per user pk, which the next test reuses
+        cache.clear()
+
+    def test_filter_matches_all_text_fields(self):
+        found = search.filter_queryset(ItemRequest.objects.all(), 'monitor')
+        self.assertEqual(set(found), {self.monitor, self.stapler})
+
+    def test_filter_matches_chosen_fields(self):
+        found = search.filter_queryset(ItemRequest.objects.all(), 'monitor', fieldnames=['description', 'purpose'])
+        self.assertEqual(set(found), {self.monitor})
+        found = search.filter_queryset(ItemRequest.objects.all(), 'monitor', fieldnames=['notes'])
+        self.assertEqual(set(found), {self.stapler})
+
+    def test_filter_matches_prefixes(self):
+        self.assertEqual(set(search.filter_queryset(ItemRequest.objects.all(), 'monit')), set())
+        self.assertEqual(set(search.filter_queryset(ItemRequest.objects.all(), 'monit', prefix=True)), {self.monitor, self.stapler})
+        self.assertEqual(set(search.filter_queryset(ItemRequest.objects.all(), 'monit refer', prefix=True)), {self.monitor})
+
+    def test_list_searches_chosen_fields_by_prefix(self):
+        get_user_model().objects.create_user(username='admin', password='admin', is_superuser=True)
+        client = Client()
+        client.login(username='admin', password='admin')
+
+        response = client.post(reverse('wishlist:itemrequest-list'), {'vista_query_submitted': '1', 'combined_text_search': 'monit'})
+        self.assertEqual(set(response.context['object_list']), {self.monitor, self.stapler})
+
+        response = client.post(reverse('wishlist:itemrequest-list'), {'vista_query_submitted': '1', 'combined_text_search': 'monit', 'text_fields_chosen': ['notes']})
+        self.assertEqual(set(response.context['object_list']), {self.stapler})
+
+    def test_missing_index_is_remembered(self):
+        search.forget_search_backend()
+        self.assertEqual(search.search_backend(), 'sqlite')
+        search._sqlite_tables['default'] = False
+        try:
+            with self.assertNumQueries(0):
+                self.assertIsNone(search.search_backend())
+        finally:
+            search.forget_search_backend()
+
+    def test_index_follows_saves_and_deletes(self):
+        self.chair.resolution_notes = 'Replaced with a monitor arm'
+        self.chair.save()
+        self.assertIn(self.chair, search.filter_queryset(ItemRequest.objects.all(), 'monitor'))
+        self.stapler.delete()
+        self.assertNotIn(self.stapler.description, [item.description for item in search.filter_queryset(ItemRequest.objects.all(), 'monitor')])
+
+    def test_ranked_search_matches_prefixes(self):
+        self.assertEqual(search.ranked_search(ItemRequest.objects.all(), 'widesc'), [self.monitor])
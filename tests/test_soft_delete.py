@@ -0,0 +1,50 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import History, ItemRequest
+
+
+class SoftDeleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='admin', password='admin', is_superuser=True)
+        cls.itemrequest = ItemRequest.objects.create(description='Doomed Request')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def test_soft_delete_hides_and_restore_shows(self):
+        url = reverse('wishlist:itemrequest-delete', kwargs={'pk': self.itemrequest.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.post(url, {'is_deleted': 'on'})
+        self.assertRedirects(response, reverse('wishlist:itemrequest-list'), fetch_redirect_response=False)
+        self.assertFalse(ItemRequest.objects.filter(pk=self.itemrequest.pk).exists())
+        deleted = ItemRequest.all_objects.get(pk=self.itemrequest.pk)
+        self.assertTrue(deleted.is_deleted)
+        self.assertIsNotNone(deleted.deleted_at)
+        self.assertTrue(History.objects.filter(objectid=self.itemrequest.pk, fieldname='is_deleted', new_value='True').exists())
+        self.assertEqual(self.client.get(reverse('wishlist:itemrequest-detail', kwargs={'pk': self.itemrequest.pk})).status_code, 404)
+
+        self.client.post(url, {})
+        self.assertIsNone(ItemRequest.objects.get(pk=self.itemrequest.pk).deleted_at)
+
+    def test_purge_removes_only_expired_tombstones(self):
+        ItemRequest.all_objects.filter(pk=self.itemrequest.pk).update(is_deleted=True, deleted_at=timezone.now() - timedelta(days=100))
+        recent = ItemRequest.objects.create(description='Recently Deleted', is_deleted=True, deleted_at=timezone.now())
+        live = ItemRequest.objects.create(description='Live Request')
+
+        call_command('purge_itemrequests', '--days', '90', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(
+            set(ItemRequest.all_objects.values_list('pk', flat=True)),
+            {recent.pk, live.pk}
+        )
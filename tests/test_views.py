@@ -1,8 +1,17 @@
-from django.test import  SimpleTestCase, TestCase, Client
-from ..forms import ProjectForm
-from ..models import Project, StatusUpdate
+import csv
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase, Client
+from ..async_views import AsyncItemRequestDetail, AsyncItemRequestList, AsyncUserLookup
+from ..benchmark import QUERY_BUDGETS, measure, scenarios, seed
+from ..models import History, ItemRequest
+from django.http import Http404
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
 
 class ViewTests(TestCase):
 
@@ -11,177 +20,216 @@ class ViewTests(TestCase):
     @classmethod
     def setUpTestData(cls):
         cls.user = get_user_model().objects.create_user(username='admin', password='admin', is_superuser=True)
+        cls.itemrequest = ItemRequest.objects.create(description='Test Request')
 
-    def test_project_list_view(self):
-        client = Client()
-        response = client.get('/prosdib/projects/')
-        self.assertEqual(response.status_code, 200)
-
-    def test_project_detail_view(self):
-        Project.objects.create()
-        client = Client()
-        response = client.get('/prosdib/project/1/')
-        self.assertEqual(response.status_code, 200)
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
 
-    def test_get_project_create_view_no_auth(self):
-        client = Client()
-        response = client.get('/prosdib/project/create/')
+    def test_itemrequest_list_view_no_auth(self):
+        response = Client().get(reverse('wishlist:itemrequest-list'))
         self.assertEqual(response.status_code, 302)
 
-    def test_get_project_create_view(self):
-        client = Client()
-        client.login(username='admin', password='admin')
-        response = client.get('/prosdib/project/create/')
+    def test_itemrequest_list_view(self):
+        response = self.client.get(reverse('wishlist:itemrequest-list'))
         self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Test Request')
 
+    def test_itemrequest_detail_view(self):
+        response = self.client.get(reverse('wishlist:itemrequest-detail', kwargs={'pk': self.itemrequest.pk}))
+        self.assertEqual(response.status_code, 200)
 
-    def test_get_project_detail_view(self):
-        client = Client()
-        project = Project.objects.create()
-        ppk = project.pk
-        response = client.get(f'/prosdib/project/{ppk}/')
+    def test_itemrequest_detail_history_timeline(self):
+        for number in range(25):
+            History.objects.create(
+                user=self.user,
+                modelname='ItemRequest',
+                objectid=self.itemrequest.pk,
+                fieldname='notes',
+                new_value=f'note {number}'
+            )
+        url = reverse('wishlist:itemrequest-detail', kwargs={'pk': self.itemrequest.pk})
+        response = self.client.get(url)
+        first_page = response.context['history_page']
+        self.assertEqual([history.new_value for history in first_page][:2], ['note 24', 'note 23'])
+        self.assertTrue(first_page.has_next())
+        response = self.client.get(url, {'history_after': first_page.next_cursor})
+        self.assertEqual([history.new_value for history in response.context['history_page']], [f'note {number}' for number in range(4, -1, -1)])
+        self.assertEqual(self.client.get(url, {'history_after': 'nonsense'}).status_code, 404)
+
+    def test_itemrequest_detail_not_modified(self):
+        url = reverse('wishlist:itemrequest-detail', kwargs={'pk': self.itemrequest.pk})
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_itemrequest_create_view(self):
+        response = self.client.get(reverse('wishlist:itemrequest-create'))
         self.assertEqual(response.status_code, 200)
 
-    def test_project_detail_name(self):
+    def test_post_itemrequest_create_view(self):
+        response = self.client.post(reverse('wishlist:itemrequest-create'), {
+            'description': 'Created Request',
+            'price_0': '',
+            'price_1': 'USD',
+            'quantity': 1,
+            'substitutability': 2,
+            'urgency': 4,
+            'status': 1,
+            'submitted_by': self.user.pk,
+            'when': '2022-02-15',
+        })
+        itemrequest = ItemRequest.objects.get(description='Created Request')
+        self.assertRedirects(response, reverse('wishlist:itemrequest-detail', kwargs={'pk': itemrequest.pk}))
+        self.assertTrue(History.objects.filter(objectid=itemrequest.pk, fieldname='description').exists())
+
+    def test_api_rejects_unsupported_filter_operator(self):
+        response = self.client.get(reverse('wishlist:api-itemrequest-list'), {'filterfield__submitted_by': 'a', 'filterop__submitted_by': 'icontains'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_needs_change_permission(self):
+        submitter = get_user_model().objects.create_user(username='viewer', password='viewer')
+        submitter.user_permissions.add(Permission.objects.get(codename='view_itemrequest'))
+        itemrequest = ItemRequest.objects.create(description='Viewer Request', submitted_by=submitter)
         client = Client()
-        project = Project.objects.create()
-        ppk = project.pk
-        self.assertEqual(reverse('prosdib:project_detail', kwargs={'pk':ppk}), f'/prosdib/project/{ppk}/')
+        client.login(username='viewer', password='viewer')
 
+        response = client.get(reverse('wishlist:itemrequest-update', kwargs={'pk': itemrequest.pk}))
+        self.assertNotEqual(response.status_code, 200)
+        self.assertNotContains(client.get(reverse('wishlist:itemrequest-list')), reverse('wishlist:itemrequest-update', kwargs={'pk': itemrequest.pk}))
 
-    def test_post_project_create_view_no_auth(self):
+    def test_bulk_update_needs_change_permission(self):
+        submitter = get_user_model().objects.create_user(username='submitter', password='submitter')
+        submitter.user_permissions.add(Permission.objects.get(codename='view_itemrequest'))
+        itemrequest = ItemRequest.objects.create(description='Own Request', status=2, urgency=4, submitted_by=submitter)
         client = Client()
-        Project.objects.filter(name="Test Project").delete()
-        response = client.post('/prosdib/project/create/', {'name': 'Test Project', 'start': '1/1/2021'})
-        project_count = Project.objects.filter(name="Test Project").count()
-        self.assertEqual(project_count, 0)
+        client.login(username='submitter', password='submitter')
 
-    def test_post_project_create_view(self):
-        client = Client()
-        client.login(username='admin', password='admin')
-        Project.objects.filter(name="Test Project").delete()
-        response = client.post('/prosdib/project/create/', {'name': 'Test Project', 'start': '1/1/2021'})
-        project_count = Project.objects.filter(name="Test Project").count()
-        self.assertEqual(project_count, 1)
+        self.assertNotContains(client.get(reverse('wishlist:itemrequest-list')), 'id="form_bulk_update"')
+        for bulk_action in ['status:3', 'urgency:1']:
+            response = client.post(reverse('wishlist:itemrequest-bulk-update'), {'bulk_action': bulk_action, 'selected': [itemrequest.pk]})
+            self.assertEqual(response.status_code, 403)
 
-    def test_get_project_update_view_no_auth(self):
-        client = Client()
-        project = Project.objects.create( name='Test Project' )
-        response = client.get(f'/prosdib/project/{project.pk}/update/')
-        self.assertEqual(response.status_code, 302)
+        itemrequest.refresh_from_db()
+        self.assertEqual((itemrequest.status, itemrequest.urgency), (2, 4))
 
-    def test_get_project_update_view(self):
-        client = Client()
-        client.login(username='admin', password='admin')
-        project = Project.objects.create( name='Test Project' )
-        response = client.get(f'/prosdib/project/{project.pk}/update/')
+        self.client.post(reverse('wishlist:itemrequest-bulk-update'), {'bulk_action': 'urgency:1', 'selected': [itemrequest.pk]})
+        itemrequest.refresh_from_db()
+        self.assertEqual(itemrequest.urgency, 1)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='exporter', password='exporter', is_superuser=True)
+        cls.monitor = ItemRequest.objects.create(description='Widescreen monitor', price=Decimal('129.99'), price_currency='EUR', status=2, submitted_by=cls.user)
+        cls.chair = ItemRequest.objects.create(description='Office chair', price=Decimal('80.00'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='exporter', password='exporter')
+
+    def tearDown(self):
+        cache.clear()
+
+    def choose_vista(self, **data):
+        self.client.post(reverse('wishlist:itemrequest-list'), dict(data, vista_query_submitted='1'))
+
+    def export(self, export_format):
+        response = self.client.get(reverse('wishlist:itemrequest-export'), {'format': export_format})
         self.assertEqual(response.status_code, 200)
+        self.assertIn(f'itemrequests.{export_format}', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
 
+    def test_csv_export_follows_the_vista(self):
+        self.choose_vista(combined_text_search='monitor', show_columns=['description', 'price', 'status', 'submitted_by'])
 
-    def test_post_project_update_view_no_auth(self):
-        client = Client()
-        project = Project.objects.create( name='Project before post' )
-        ppk = project.pk
-        response = client.post(f'/prosdib/project/{ ppk }/update/', {'name': 'Project after post', 'start': '1/2/2021'})
-        project = Project.objects.get( pk=ppk )
-        self.assertEqual(project.name, 'Project before post')
+        rows = list(csv.reader(self.export('csv').splitlines()))
 
-    def test_post_project_update_view_auth(self):
-        client = Client()
-        client.login(username='admin', password='admin')
-        project = Project.objects.create( name='Project before post' )
-        ppk = project.pk
-        response = client.post(f'/prosdib/project/{ ppk }/update/', {'name': 'Project after post', 'start': '1/2/2021'})
-        project = Project.objects.get( pk=ppk )
-        self.assertEqual(project.name, 'Project after post')
-
-    def test_post_project_created_by(self):
-        client = Client()
-        client.login(username='admin', password='admin')
-        response = client.post(f'/prosdib/project/create/', {'name': 'New Project', 'start': '1/2/2021'})
-        self.assertEqual(Project.objects.get(name='New Project').created_by, get_user_model().objects.get(username="admin") )
+        self.assertEqual(rows[0], ['id', 'description', 'price', 'price_currency', 'status', 'submitted_by__username'])
+        self.assertEqual(rows[1:], [[str(self.monitor.pk), 'Widescreen monitor', '129.99', 'EUR', '2) Approved', 'exporter']])
 
-class ProjectCreatestatusupdateFormsetTests(TestCase):
+    def test_jsonl_export(self):
+        self.choose_vista(show_columns=['description', 'price'], order_by=['price'])
 
-    @classmethod
-    def setUpTestData(cls):
-        cls.superuser = get_user_model().objects.create_user(
-            username = "superone",
-            password = "TestSuper#1",
-            is_superuser = True
-        )
-
-    def test_project_post_with_statusupdate_create_with_superuser(self):
-        c = Client()
-        c.login(username = "superone", password="TestSuper#1")
-        response = c.post('/prosdib/project/create/', {
-            'name':'Project One',
-            'start':'1/1/2021',
-            'statusupdate_set-TOTAL_FORMS':3,
-            'statusupdate_set-INITIAL_FORMS':0,
-            'statusupdate_set-MIN_NUM_FORMS':0,
-            'statusupdate_set-MAX_NUM_FORMS':0,
-            'statusupdate_set-0-when':'2021-11-19',
-            'initial-statusupdate_set-0-when':'2021-11-19',
-            'statusupdate_set-0-text':'Project Update One',
-            'statusupdate_set-1-when':'2021-11-19',
-            'initial-statusupdate_set-1-when':'2021-11-19',
-            'statusupdate_set-1-text':'',
-            'statusupdate_set-2-when':'2021-11-19',
-            'initial-statusupdate_set-2-when':'2021-11-19',
-            'statusupdate_set-2-text':'',
-        })
-        self.assertEqual(Project.objects.count(), 1)
-        self.assertEqual(StatusUpdate.objects.count(), 1)
-        self.assertEqual(StatusUpdate.objects.first().project.pk, Project.objects.first().pk)
+        rows = [json.loads(line) for line in self.export('jsonl').splitlines()]
+
+        self.assertEqual(rows, [
+            {'id': self.chair.pk, 'description': 'Office chair', 'price': '80.00', 'price_currency': 'USD'},
+            {'id': self.monitor.pk, 'description': 'Widescreen monitor', 'price': '129.99', 'price_currency': 'EUR'},
+        ])
+
+    def test_unknown_format_is_not_found(self):
+        response = self.client.get(reverse('wishlist:itemrequest-export'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 404)
 
-class ProjectUpdatestatusupdateFormsetTests(TestCase):
+
+class AsyncViewTests(TestCase):
 
     @classmethod
     def setUpTestData(cls):
-        cls.superuser = get_user_model().objects.create_user(
-            username = "superone",
-            password = "TestSuper#1",
-            is_superuser = True
-        )
-        cls.project_one = Project.objects.create(
-            name = 'Project one'
-        )
-        cls.statusupdate_one = StatusUpdate.objects.create(
-            project = cls.project_one,
-            text = 'Project Note One',
-        )
-
-    def test_project_post_with_statusupdate_update_with_superuser(self):
-        c = Client()
-        c.login(username = "superone", password="TestSuper#1")
-        response = c.post('/prosdib/project/' + str(self.project_one.pk) + '/update/', {
-            'name':'Project One Updated',
-            'start':'1/1/2001',
-            'statusupdate_set-TOTAL_FORMS':4,
-            'statusupdate_set-INITIAL_FORMS':1,
-            'statusupdate_set-MIN_NUM_FORMS':0,
-            'statusupdate_set-MAX_NUM_FORMS':0,
-            'statusupdate_set-0-id':self.statusupdate_one.pk,
-            'statusupdate_set-0-project':self.project_one.pk,
-            'statusupdate_set-0-when':'2021-11-19',
-            'initial-statusupdate_set-0-when':'2021-11-19',
-            'statusupdate_set-0-text':'Project Note One Updated',
-
-            'statusupdate_set-1-Project':self.project_one.pk,
-            'statusupdate_set-1-when':'2021-11-19',
-            'initial-statusupdate_set-1-when':'2021-11-19',
-            'statusupdate_set-1-text':'Project Note Two',
-
-            'statusupdate_set-2-Project':self.project_one.pk,
-            'statusupdate_set-2-when':'2021-11-19',
-            'initial-statusupdate_set-2-when':'2021-11-19',
-            'statusupdate_set-2-text':'',
-            'statusupdate_set-3-when':'2021-11-19',
-            'initial-statusupdate_set-3-when':'2021-11-19',
-            'statusupdate_set-3-text':'',
-        })
-        self.assertEqual(Project.objects.count(), 1)
-        self.assertEqual(StatusUpdate.objects.count(), 2)
-        self.assertEqual(StatusUpdate.objects.first().project.pk, Project.objects.first().pk)
-        self.assertEqual(StatusUpdate.objects.all()[1].project.pk, Project.objects.first().pk)
+        cls.user = get_user_model().objects.create_user(username='asyncadmin', password='admin', is_superuser=True)
+        cls.itemrequest = ItemRequest.objects.create(description='Async Request')
+
+    async def get(self, view, url, **kwargs):
+        request = AsyncRequestFactory().get(url)
+        request.user = self.user
+        response = await view.as_view()(request, **kwargs)
+        if hasattr(response, 'render'):
+            await sync_to_async(response.render)()
+        return response
+
+    async def test_async_detail_view(self):
+        response = await self.get(AsyncItemRequestDetail, '/', pk=self.itemrequest.pk)
+        self.assertContains(response, 'Async Request')
+        self.assertTrue(response.has_header('ETag'))
+
+    async def test_async_detail_view_missing(self):
+        with self.assertRaises(Http404):
+            await self.get(AsyncItemRequestDetail, '/', pk=0)
+
+    async def test_async_list_view(self):
+        response = await self.get(AsyncItemRequestList, '/?page=1')
+        self.assertContains(response, 'Async Request')
+
+    async def test_async_user_lookup(self):
+        response = await self.get(AsyncUserLookup, '/?q=asyncad')
+        self.assertEqual(json.loads(response.content)['results'], [{'id': self.user.pk, 'text': 'asyncadmin'}])
+
+
+class QueryBudgetTests(TestCase):
+    # Every view must stay within its query budget, and the budget must not
+    # depend on how many rows there are
+
+    def test_views_within_query_budgets(self):
+        itemrequest_pks = seed(requests=120, history=300, users=10, vistas=3)
+        client = Client()
+        client.force_login(get_user_model().objects.create_superuser('budget-admin', 'budget@example.com', None))
+
+        for name, method, url, data in scenarios(itemrequest_pks):
+            result = measure(client, name, method, url, data, repeat=2)
+            self.assertEqual(result['status_code'], 302 if name in ('create', 'update', 'bulk_update') else 200, name)
+            self.assertLessEqual(result['queries'], QUERY_BUDGETS[name], name)
+            if name == 'create_duplicate':
+                self.assertTrue(client.post(url, data).context['similar_requests'])
+
+        small = self.steady_queries('budget-small', itemrequest_pks)
+        itemrequest_pks = seed(requests=600, history=1500, users=10, vistas=3, seed=1, prefix='scale')
+        self.assertEqual(self.steady_queries('budget-large', itemrequest_pks), small)
+
+    def steady_queries(self, username, itemrequest_pks):
+        # The queries of each page for a user with no saved vista, once the
+        # caches are warm, so that only the number of rows differs
+        client = Client()
+        client.force_login(get_user_model().objects.create_superuser(username, f'{username}@example.com', None))
+
+        queries = {}
+        for name, method, url, data in scenarios(itemrequest_pks):
+            if method == 'get':
+                client.get(url, data)
+                result = measure(client, name, method, url, data, repeat=2)
+                self.assertEqual(result['status_code'], 200, name)
+                queries[name] = result['queries']
+        return queries
@@ -1,15 +1,38 @@
+from django.conf import settings
 from django.views.generic.base import RedirectView
 from django.urls import path, reverse_lazy
-from . import views
+from . import api, async_views, views
 
 app_name = 'wishlist'
 
-urlpatterns = [
-    path('', RedirectView.as_view(url=reverse_lazy('wishlist:itemrequest-list'))),
-    path('wishlist/', RedirectView.as_view(url=reverse_lazy('wishlist:itemrequest-list'))),
-    path('itemrequest/create/', views.ItemRequestCreate.as_view(), name='itemrequest-create'),
-    path('itemrequest/<int:pk>/update/', views.ItemRequestUpdate.as_view(), name='itemrequest-update'),
-    path('itemrequest/<int:pk>/detail/', views.ItemRequestDetail.as_view(), name='itemrequest-detail'),
-    path('itemrequest/<int:pk>/delete/', views.ItemRequestSoftDelete.as_view(), name='itemrequest-delete'),
-    path('itemrequest/list/', views.ItemRequestList.as_view(), name='itemrequest-list'),
-]
+
+def wishlist_urlpatterns(use_async_views=False):
+    # The async list, detail and lookup views free the worker while they wait
+    # on the database; WISHLIST_ASYNC_VIEWS picks them for the deployed urls
+
+    if use_async_views:
+        list_view, detail_view, lookup_view = async_views.AsyncItemRequestList, async_views.AsyncItemRequestDetail, async_views.AsyncUserLookup
+    else:
+        list_view, detail_view, lookup_view = views.ItemRequestList, views.ItemRequestDetail, views.UserLookup
+
+    return [
+        path('', RedirectView.as_view(url=reverse_lazy('wishlist:itemrequest-list'))),
+        path('wishlist/', RedirectView.as_view(url=reverse_lazy('wishlist:itemrequest-list'))),
+        path('itemrequest/create/', views.ItemRequestCreate.as_view(), name='itemrequest-create'),
+        path('itemrequest/<int:pk>/update/', views.ItemRequestUpdate.as_view(), name='itemrequest-update'),
+        path('itemrequest/<int:pk>/detail/', detail_view.as_view(), name='itemrequest-detail'),
+        path('itemrequest/<int:pk>/delete/', views.ItemRequestSoftDelete.as_view(), name='itemrequest-delete'),
+        path('itemrequest/list/', list_view.as_view(), name='itemrequest-list'),
+        path('itemrequest/triage/', views.ItemRequestTriage.as_view(), name='itemrequest-triage'),
+        path('itemrequest/bulk-update/', views.ItemRequestBulkUpdate.as_view(), name='itemrequest-bulk-update'),
+        path('itemrequest/export/', views.ItemRequestExport.as_view(), name='itemrequest-export'),
+        path('budget/', views.BudgetRollupList.as_view(), name='budgetrollup-list'),
+        path('itemrequest/search/', views.ItemRequestSearch.as_view(), name='itemrequest-search'),
+        path('api/itemrequests/', api.ItemRequestApiList.as_view(), name='api-itemrequest-list'),
+        path('api/itemrequests/<int:pk>/', api.ItemRequestApiDetail.as_view(), name='api-itemrequest-detail'),
+        path('user/lookup/', lookup_view.as_view(), name='user-lookup'),
+        path('stats/', views.ViewStats.as_view(), name='view-stats'),
+    ]
+
+
+urlpatterns = wishlist_urlpatterns(getattr(settings, 'WISHLIST_ASYNC_VIEWS', False))
@@ -1,6 +1,8 @@
+import csv
+import hashlib
 import json
-import sys
-from urllib import request
+import logging
+from functools import lru_cache
 
 from django.apps import AppConfig
 from django.conf import settings
@@ -8,10 +10,18 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import (PermissionRequiredMixin,
                                         UserPassesTestMixin)
+from django.core.cache import cache
 from django.core.exceptions import FieldError, ObjectDoesNotExist
-from django.core.mail import send_mail
+from django.db import transaction
+from django.core.paginator import InvalidPage
+from django.db.models import Max
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.generic.base import View
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
@@ -22,30 +32,214 @@ from tougshire_vistas.views import (delete_vista, get_global_vista,
                                     retrieve_vista)
 
 from .forms import ItemRequestForm
-from .models import History, ItemRequest
+from .instrumentation import InstrumentedViewMixin, view_stats
+from .models import OPEN_STATUSES, BudgetRollup, History, ItemRequest, Notification, status_notifications
+from . import duplicates, search
+from .links import link_health, links_checked
+from .pagination import EstimatedCountPaginator, KeysetPaginator
 
+logger = logging.getLogger(__name__)
+
+
+def history_changeset(form, modelname, object, user):
+    changeset = []
 
-def update_history(form, modelname, object, user):
     for fieldname in form.changed_data:
         try:
-            old_value = str(form.initial[fieldname]),
+            old_value = str(form.initial[fieldname])
         except KeyError:
             old_value = None
 
-        history = History.objects.create(
+        changeset.append(History(
             user=user,
             modelname=modelname,
             objectid=object.pk,
             fieldname=fieldname,
             old_value=old_value,
             new_value=str(form.cleaned_data[fieldname])
-        )
+        ))
+
+    return changeset
+
+
+def update_history(form, modelname, object, user):
+    return History.objects.bulk_create(history_changeset(form, modelname, object, user))
+
+
+def itemrequest_vista_settings():
+    vista_settings={
+        'text_fields_available':[],
+        'filter_fields_available':{},
+        'order_by_fields_available':[],
+        'columns_available':[]
+    }
+
+    vista_settings['text_fields_available']=[
+        'description',
+        'purpose',
+        'notes',
+        'resolution_notes',
+    ]
+
+    vista_settings['filter_fields_available'] = [
+        'description',
+        'purpose',
+        'notes',
+        'price',
+        'link',
+        'substitutability',
+        'urgency',
+        'status',
+        'submitted_by',
+        'when',
+        'resolution_notes',
+    ]
+
+    for fieldname in [
+        'price',
+        'urgency',
+        'status',
+        'submitted_by',
+        'when',
+        'priority',
+    ]:
+        vista_settings['order_by_fields_available'].append(fieldname)
+        vista_settings['order_by_fields_available'].append('-' + fieldname)
+
+    for fieldname in [
+        'description',
+        'purpose',
+        'notes',
+        'price',
+        'link',
+        'substitutability',
+        'urgency',
+        'status',
+        'submitted_by',
+        'when',
+        'resolution_notes',
+    ]:
+        vista_settings['columns_available'].append(fieldname)
+
+    return vista_settings
+
+
+@lru_cache(maxsize=None)
+def itemrequest_labels():
+    return { field.name: field.verbose_name.title() for field in ItemRequest._meta.get_fields() if type(field).__name__[-3:] != 'Rel' }
+
+
+def itemrequest_column_spec(columns):
+    column_spec = []
+
+    for fieldname in columns:
+        field = ItemRequest._meta.get_field(fieldname)
+        column_spec.append({
+            'name': fieldname,
+            'label': field.verbose_name.title(),
+            'attname': field.attname,
+            'choices': dict(field.flatchoices) if field.choices else None,
+        })
+
+    return column_spec
+
+
+def itemrequest_bulk_actions():
+    bulk_actions = []
+
+    for fieldname in ['status', 'urgency']:
+        field = ItemRequest._meta.get_field(fieldname)
+        for value, label in field.choices:
+            bulk_actions.append({'name': f'{fieldname}:{value}', 'label': f'Set {field.verbose_name.title()} to {label}'})
+
+    return bulk_actions
+
+
+def project_itemrequest_columns(queryset, show_columns, extra_fields=[]):
+    # Loads only the columns the list will show, joining the submitter instead of
+    # fetching it row by row
+
+    column_fields = {
+        'price': ['price', 'price_currency'],
+    }
+
+    fields = []
+    for column in show_columns:
+        fields.extend(column_fields.get(column, [column]))
+    fields.extend(extra_fields)
+
+    if 'submitted_by' in show_columns:
+        queryset = queryset.select_related('submitted_by')
+
+    return queryset.only(*fields)
+
+
+def itemrequest_changed(request, *args, **kwargs):
+    # The last change to the request in the url, or to any request, or to the link
+    # health, memoized on the request because the ETag and Last-Modified checks
+    # both ask for it
+
+    if not hasattr(request, 'wishlist_changed'):
+        if 'pk' in kwargs:
+            changed = ItemRequest.objects.filter(pk=kwargs['pk']).values_list('modified', flat=True).first()
+        else:
+            # deleted rows count too, since soft deleting a request bumps its modified
+            changed = ItemRequest.all_objects.aggregate(Max('modified'))['modified__max']
+            deleted = cache.get('wishlist:itemrequest:deleted')
+            if deleted and (changed is None or deleted > changed):
+                changed = deleted
+        # the pages show link health, which check_links changes without touching modified
+        checked = links_checked()
+        if changed is not None and checked and checked > changed:
+            changed = checked
+        request.wishlist_changed = changed
+
+    return request.wishlist_changed
+
+
+def itemrequest_etag(request, *args, **kwargs):
+
+    if len(messages.get_messages(request)):
+        return None
+
+    changed = itemrequest_changed(request, *args, **kwargs)
+    if changed is None:
+        return None
+
+    return hashlib.md5('{}:{}:{}'.format(request.user.pk, kwargs.get('pk', ''), changed.isoformat()).encode()).hexdigest()
+
 
-        history.save()
+def itemrequest_list_etag(request, *args, **kwargs):
+    # The list also depends on the user's vista, so only a cached vista can be
+    # compared without resolving it
 
+    cached_vista = cache.get('wishlist:vista:{}'.format(request.user.pk))
+    etag = itemrequest_etag(request, *args, **kwargs)
+    if cached_vista is None or etag is None:
+        return None
 
+    return hashlib.md5('{}:{}'.format(etag, repr(cached_vista['context'])).encode()).hexdigest()
 
-class ItemRequestCreate(PermissionRequiredMixin, CreateView):
+
+class ItemRequestHistoryMixin:
+
+    def form_valid(self, form):
+        # read before saving, since the post_save handlers refresh _loaded_values
+        old_status = form.initial.get('status') if self.object is not None else None
+
+        with transaction.atomic():
+            response = super().form_valid(form)
+            update_history(form, 'ItemRequest', self.object, self.request.user)
+            if old_status is not None:
+                Notification.objects.bulk_create(status_notifications(
+                    [(self.object.pk, self.object.submitted_by_id, old_status, self.object.status)],
+                    self.request.user
+                ))
+
+        return response
+
+
+class ItemRequestCreate(InstrumentedViewMixin, PermissionRequiredMixin, ItemRequestHistoryMixin, CreateView):
     permission_required = 'wishlist.add_itemrequest'
     model = ItemRequest
     form_class = ItemRequestForm
@@ -57,12 +251,22 @@ class ItemRequestCreate(PermissionRequiredMixin, CreateView):
 
         return initial
 
+    def form_valid(self, form):
+        # A likely duplicate of an open request sends the form back with the
+        # matches listed, until the submitter confirms it is a new request
+        if not self.request.POST.get('not_duplicate'):
+            with self.timed('duplicates_ms'):
+                similar_requests = duplicates.similar_requests(form.cleaned_data.get('description'), form.cleaned_data.get('purpose'))
+            if similar_requests:
+                return self.render_to_response(self.get_context_data(form=form, similar_requests=similar_requests))
+
+        return super().form_valid(form)
 
     def get_success_url(self):
         return reverse_lazy('wishlist:itemrequest-detail', kwargs={'pk': self.object.pk})
 
 
-class ItemRequestUpdate(PermissionRequiredMixin, UpdateView):
+class ItemRequestUpdate(InstrumentedViewMixin, PermissionRequiredMixin, ItemRequestHistoryMixin, UpdateView):
     permission_required = 'wishlist.change_itemrequest'
 
     model = ItemRequest
@@ -72,103 +276,100 @@ class ItemRequestUpdate(PermissionRequiredMixin, UpdateView):
 
         return reverse_lazy('wishlist:itemrequest-detail', kwargs={'pk': self.object.pk})
 
-class ItemRequestDetail(PermissionRequiredMixin, DetailView):
+@method_decorator(condition(etag_func=itemrequest_etag, last_modified_func=itemrequest_changed), name='get')
+class ItemRequestDetail(InstrumentedViewMixin, PermissionRequiredMixin, DetailView):
     permission_required = 'wishlist.view_itemrequest'
     model = ItemRequest
+    history_paginate_by = 20
+
+    def get_history_paginator(self):
+        # One query with the acting user joined, seeking on (when, id) through
+        # wishlist_history_object_idx however many edits the request has
+
+        return KeysetPaginator(
+            History.objects.filter(modelname='ItemRequest', objectid=self.kwargs['pk']).select_related('user'),
+            self.history_paginate_by,
+            ['-when', '-pk']
+        )
+
+    def get_history_page(self):
+        try:
+            return self.get_history_paginator().page(after=self.request.GET.get('history_after'), before=self.request.GET.get('history_before'))
+        except InvalidPage as e:
+            raise Http404(str(e))
 
     def get_context_data(self, **kwargs):
 
         context_data = super().get_context_data(**kwargs)
-        context_data['itemrequest_labels'] = {field.name: field.verbose_name.title(
-        ) for field in ItemRequest._meta.get_fields() if type(field).__name__[-3:] != 'Rel'}
+        context_data['itemrequest_labels'] = itemrequest_labels()
+        if 'history_page' not in context_data:
+            context_data['history_page'] = self.get_history_page()
+        context_data['link_health'] = link_health([self.object.link]).get(self.object.link)
 
         return context_data
 
 
-class ItemRequestDelete(PermissionRequiredMixin, UpdateView):
+class ItemRequestDelete(InstrumentedViewMixin, PermissionRequiredMixin, UpdateView):
     permission_required = 'wishlist.delete_itemrequest'
     model = ItemRequest
     success_url = reverse_lazy('wishlist:itemrequest-list')
 
 
-class ItemRequestSoftDelete(PermissionRequiredMixin, UpdateView):
+class ItemRequestSoftDelete(InstrumentedViewMixin, PermissionRequiredMixin, ItemRequestHistoryMixin, UpdateView):
+    # Marks the request deleted, keeping it and its history until it is purged,
+    # or restores it
     permission_required = 'wishlist.delete_itemrequest'
     model = ItemRequest
-    template_name = 'wishlist/item_confirm_delete.html'
-    success_url = reverse_lazy('wishlist:itemrequest-list')
+    template_name = 'wishlist/itemrequest_confirm_delete.html'
     fields = ['is_deleted']
 
+    def get_queryset(self):
+        return ItemRequest.all_objects.all()
+
+    def form_valid(self, form):
+        form.instance.deleted_at = timezone.now() if form.instance.is_deleted else None
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        if self.object.is_deleted:
+            return reverse('wishlist:itemrequest-list')
+        return reverse('wishlist:itemrequest-detail', kwargs={'pk': self.object.pk})
+
     def get_context_data(self, **kwargs):
 
         context_data = super().get_context_data(**kwargs)
-        context_data['itemrequest_labels'] = {field.name: field.verbose_name.title(
-        ) for field in ItemRequest._meta.get_fields() if type(field).__name__[-3:] != 'Rel'}
+        context_data['itemrequest_labels'] = itemrequest_labels()
 
         return context_data
 
-class ItemRequestList(PermissionRequiredMixin, ListView):
+@method_decorator(condition(etag_func=itemrequest_list_etag), name='get')
+class ItemRequestList(InstrumentedViewMixin, PermissionRequiredMixin, ListView):
     permission_required = 'wishlist.view_itemrequest'
     model = ItemRequest
     paginate_by = 30
+    pagination_mode = getattr(settings, 'WISHLIST_PAGINATION_MODE', 'offset')
+    estimate_count = getattr(settings, 'WISHLIST_ESTIMATE_COUNT', False)
+    vista_cache_timeout = getattr(settings, 'WISHLIST_VISTA_CACHE_TIMEOUT', 300)
+    default_columns = [
+        'description',
+        'purpose',
+        'notes',
+        'price',
+        'link',
+        'substitutability',
+        'urgency',
+        'status',
+        'submitted_by',
+        'when',
+    ]
 
 
     def setup(self, request, *args, **kwargs):
 
-        self.vista_settings={
-            'text_fields_available':[],
-            'filter_fields_available':{},
-            'order_by_fields_available':[],
-            'columns_available':[]
-        }
-
-        self.vista_settings['text_fields_available']=[
-            'description',
-            'purpose',
-            'notes',
-            'resolution_notes',
-        ]
-
-        self.vista_settings['filter_fields_available'] = [
-            'description',
-            'purpose',
-            'notes',
-            'price',
-            'link',
-            'substitutability',
-            'urgency',
-            'status',
-            'submitted_by',
-            'when',
-            'resolution_notes',
-        ]
-
-        for fieldname in [
-            'price',
-            'urgency',
-            'status',
-            'submitted_by',
-            'when',
-        ]:
-            self.vista_settings['order_by_fields_available'].append(fieldname)
-            self.vista_settings['order_by_fields_available'].append('-' + fieldname)
-
-        for fieldname in [
-            'description',
-            'purpose',
-            'notes',
-            'price',
-            'link',
-            'substitutability',
-            'urgency',
-            'status',
-            'submitted_by',
-            'when',
-            'resolution_notes',
-        ]:
-            self.vista_settings['columns_available'].append(fieldname)
+        self.vista_settings = itemrequest_vista_settings()
 
         self.vista_defaults = {
-            'order_by': Item._meta.ordering,
+            'order_by': ItemRequest._meta.ordering,
             'paginate_by':self.paginate_by
         }
 
@@ -189,30 +390,93 @@ class ItemRequestList(PermissionRequiredMixin, ListView):
 
         vistaobj={'context':{}, 'queryset':queryset}
 
-        if 'delete_vista' in self.request.POST:
-            delete_vista(self.request)
-
-        if 'vista_query_submitted' in self.request.POST:
-            vistaobj = make_vista(self.request, self.vista_settings, super().get_queryset(), self.vista_defaults)
-        elif 'retrieve_vista' in self.request.POST:
-            vistaobj = retrieve_vista(self.request, self.vista_settings, super().get_queryset(), self.vista_defaults)
-        else:
-            try:
-                vistaobj =  get_latest_vista(self.request, self.vista_settings, super().get_queryset(), self.vista_defaults)
-            except Exception as e:
-                print(e, ' at ', sys.exc_info()[2].tb_lineno)
-                try:
-                    vistaobj =  get_global_vista(self.request, self.vista_settings, super().get_queryset(), self.vista_defaults)
-                except Exception as e:
-                    print(e, ' at ', sys.exc_info()[2].tb_lineno)
+        vista_settings = self.vista_settings
+        indexed_search = search.search_backend(queryset.db) is not None
+        if indexed_search:
+            # the search index replaces the vista's icontains scan of the text
+            # fields; filter_queryset below searches the chosen ones by word prefix
+            vista_settings = dict(self.vista_settings, text_fields_available=[])
+
+        with self.timed('vista_ms'):
+            vista_cache_key = 'wishlist:vista:{}'.format(self.request.user.pk)
+
+            if 'delete_vista' in self.request.POST:
+                delete_vista(self.request)
+                cache.delete(vista_cache_key)
+
+            cached_vista = None
+            if 'vista_query_submitted' in self.request.POST:
+                vistaobj = make_vista(self.request, vista_settings, super().get_queryset(), self.vista_defaults)
+            elif 'retrieve_vista' in self.request.POST:
+                vistaobj = retrieve_vista(self.request, vista_settings, super().get_queryset(), self.vista_defaults)
+            else:
+                cached_vista = cache.get(vista_cache_key)
+                if cached_vista is not None and cached_vista['indexed_search'] == indexed_search:
+                    vistaobj = {'context': cached_vista['context'], 'queryset': super().get_queryset()}
+                    vistaobj['queryset'].query = cached_vista['query']
+                else:
+                    cached_vista = None
+                    try:
+                        vistaobj =  get_latest_vista(self.request, vista_settings, super().get_queryset(), self.vista_defaults)
+                    except Exception as e:
+                        logger.info('No latest vista for %s, trying the global vista: %s', self.request.user, e)
+                        try:
+                            vistaobj =  get_global_vista(self.request, vista_settings, super().get_queryset(), self.vista_defaults)
+                        except Exception as e:
+                            logger.info('No global vista for %s: %s', self.request.user, e)
+
+            if cached_vista is None:
+                cached_vista = {
+                    'context': vistaobj['context'],
+                    'query': vistaobj['queryset'].query,
+                    'indexed_search': indexed_search,
+                    'vistas': list(Vista.objects.filter(user=self.request.user, model_name='wishlist.itemrequest').values('name')),
+                }
+                cache.set(vista_cache_key, cached_vista, self.vista_cache_timeout)
+
+            self.saved_vistas = cached_vista['vistas']
 
         for key in vistaobj['context']:
             self.vista_context[key] = vistaobj['context'][key]
 
         queryset = vistaobj['queryset']
 
+        if indexed_search:
+            queryset = search.filter_queryset(
+                queryset,
+                self.vista_context.get('combined_text_search') or '',
+                prefix=True,
+                fieldnames=[fieldname for fieldname in self.vista_context.get('text_fields_chosen') or [] if fieldname in self.vista_settings['text_fields_available']],
+            )
+
+        self.show_columns = [column for column in self.vista_context.get('show_columns') or [] if column in self.vista_settings['columns_available']]
+        order_by_fields = [fieldname.lstrip('-') for fieldname in self.get_ordering_fields(queryset) if '__' not in fieldname] + ['modified', 'submitted_by']
+        queryset = project_itemrequest_columns(queryset, self.show_columns or self.default_columns, order_by_fields)
+
         return queryset
 
+    def get_ordering_fields(self, queryset):
+        order_by = [fieldname for fieldname in queryset.query.order_by if isinstance(fieldname, str)]
+        return order_by or list(ItemRequest._meta.ordering)
+
+    def get_paginator(self, queryset, per_page, *args, **kwargs):
+        if self.estimate_count:
+            return EstimatedCountPaginator(queryset, per_page, *args, **kwargs)
+        return super().get_paginator(queryset, per_page, *args, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+
+        if self.pagination_mode == 'keyset':
+            paginator = KeysetPaginator(queryset, page_size, self.get_ordering_fields(queryset))
+            if paginator.is_supported:
+                try:
+                    page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+                except InvalidPage as e:
+                    raise Http404(str(e))
+                return (paginator, page, page.object_list, page.has_other_pages())
+
+        return super().paginate_queryset(queryset, page_size)
+
     def get_paginate_by(self, queryset):
 
         if 'paginate_by' in self.vista_context and self.vista_context['paginate_by']:
@@ -224,7 +488,8 @@ class ItemRequestList(PermissionRequiredMixin, ListView):
 
         context_data = super().get_context_data(**kwargs)
 
-        context_data['users'] = get_user_model().objects.all()
+        submitted_by_chosen = self.vista_context.get('filter', {}).get('filterfield__submitted_by') or []
+        context_data['users'] = get_user_model().objects.filter(pk__in=[pk for pk in submitted_by_chosen if str(pk).isdigit()])
 
         context_data['order_by_fields_available'] = []
         for fieldname in self.vista_settings['order_by_fields_available']:
@@ -235,7 +500,7 @@ class ItemRequestList(PermissionRequiredMixin, ListView):
 
         context_data['columns_available'] = [{ 'name':fieldname, 'label':ItemRequest._meta.get_field(fieldname).verbose_name.title() } for fieldname in self.vista_settings['columns_available']]
 
-        context_data['vistas'] = Vista.objects.filter(user=self.request.user, model_name='wishlist.itemrequest').all()
+        context_data['vistas'] = self.saved_vistas
 
         if self.request.POST.get('vista__name'):
             context_data['vista__name'] = self.request.POST.get('vista__name')
@@ -254,9 +519,206 @@ class ItemRequestList(PermissionRequiredMixin, ListView):
             if key in self.vista_context and self.vista_context[key]:
                 context_data[key] = self.vista_context[key]
 
-        context_data['itemrequest_labels'] = { field.name: field.verbose_name.title() for field in ItemRequest._meta.get_fields() if type(field).__name__[-3:] != 'Rel' }
+        context_data['itemrequest_labels'] = itemrequest_labels()
+        context_data['show_columns'] = self.show_columns
+        context_data['list_columns'] = itemrequest_column_spec(self.show_columns or self.default_columns)
+        context_data['bulk_actions'] = itemrequest_bulk_actions()
 
         return context_data
 
     def get_success_url(self):
         return reverse_lazy('wishlist:itemrequest-detail', kwargs={'pk': self.object.itemrequest.pk})
+
+
+class ItemRequestTriage(InstrumentedViewMixin, PermissionRequiredMixin, ListView):
+    permission_required = 'wishlist.view_itemrequest'
+    model = ItemRequest
+    template_name = 'wishlist/itemrequest_triage.html'
+    default_size = 25
+    max_size = 200
+    columns = ['description', 'urgency', 'substitutability', 'price', 'quantity', 'when', 'status', 'priority']
+
+    def get_queryset(self):
+        try:
+            size = min(max(int(self.request.GET.get('n', self.default_size)), 1), self.max_size)
+        except ValueError:
+            size = self.default_size
+
+        # the filter is the condition of wishlist_ir_triage_idx and the ordering its
+        # columns, so this reads the first entries of the index and stops
+        queryset = ItemRequest.objects.filter(status__in=OPEN_STATUSES).order_by('-priority', '-pk')
+        return project_itemrequest_columns(queryset, self.columns, ['submitted_by'])[:size]
+
+    def get_context_data(self, **kwargs):
+
+        context_data = super().get_context_data(**kwargs)
+        context_data['list_columns'] = itemrequest_column_spec(self.columns)
+        context_data['bulk_actions'] = itemrequest_bulk_actions()
+
+        return context_data
+
+
+class ItemRequestBulkUpdate(InstrumentedViewMixin, PermissionRequiredMixin, View):
+    # The same permission as the edit form, which can change the same fields
+    permission_required = 'wishlist.change_itemrequest'
+
+    def post(self, request, *args, **kwargs):
+
+        bulk_actions = [bulk_action['name'] for bulk_action in itemrequest_bulk_actions()]
+        if request.POST.get('bulk_action') not in bulk_actions:
+            messages.error(request, 'Please choose an action')
+            return HttpResponseRedirect(reverse('wishlist:itemrequest-list'))
+
+        fieldname, value = request.POST['bulk_action'].split(':')
+        selected = [pk for pk in request.POST.getlist('selected') if pk.isdigit()]
+
+        queryset = ItemRequest.objects.filter(pk__in=selected)
+        updated = queryset.update_with_history(request.user, **{fieldname: int(value)})
+
+        messages.success(request, f'Updated {updated} of {len(selected)} selected requests')
+
+        return HttpResponseRedirect(reverse('wishlist:itemrequest-list'))
+
+
+class BudgetRollupList(InstrumentedViewMixin, PermissionRequiredMixin, ListView):
+    permission_required = 'wishlist.view_itemrequest'
+    model = BudgetRollup
+
+    def get_context_data(self, **kwargs):
+
+        context_data = super().get_context_data(**kwargs)
+
+        totals = {}
+        for bucket in context_data['object_list']:
+            total = totals.setdefault(bucket.currency, {'currency': bucket.currency, 'count': 0, 'quantity': 0, 'total': 0})
+            total['count'] += bucket.count
+            total['quantity'] += bucket.quantity
+            total['total'] += bucket.total
+        context_data['totals'] = list(totals.values())
+
+        return context_data
+
+
+class Echo:
+    # A file-like object for csv.writer that hands each line back instead of storing it
+
+    def write(self, value):
+        return value
+
+
+class ItemRequestExport(ItemRequestList):
+    http_method_names = ['get']
+    chunk_size = 2000
+    export_formats = {
+        'csv': 'text/csv',
+        'jsonl': 'application/x-ndjson',
+    }
+
+    def get(self, request, *args, **kwargs):
+
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in self.export_formats:
+            raise Http404('Unknown export format')
+
+        queryset = self.get_queryset()
+        columns = self.show_columns or self.default_columns
+
+        value_fields = {
+            'price': ['price', 'price_currency'],
+            'submitted_by': ['submitted_by__username'],
+        }
+        fieldnames = ['id']
+        for column in columns:
+            fieldnames.extend(value_fields.get(column, [column]))
+
+        choices = {column['name']: column['choices'] for column in itemrequest_column_spec(columns) if column['choices']}
+
+        def rows():
+            for row in queryset.values(*fieldnames).iterator(chunk_size=self.chunk_size):
+                for fieldname, labels in choices.items():
+                    row[fieldname] = labels.get(row[fieldname], row[fieldname])
+                yield row
+
+        def csv_lines():
+            writer = csv.writer(Echo())
+            yield writer.writerow(fieldnames)
+            for row in rows():
+                yield writer.writerow([row[fieldname] for fieldname in fieldnames])
+
+        def jsonl_lines():
+            for row in rows():
+                yield json.dumps(row, default=str) + '\n'
+
+        content = csv_lines() if export_format == 'csv' else jsonl_lines()
+
+        response = StreamingHttpResponse(content, content_type=self.export_formats[export_format])
+        response['Content-Disposition'] = f'attachment; filename="itemrequests.{export_format}"'
+        return response
+
+
+class ItemRequestSearch(InstrumentedViewMixin, PermissionRequiredMixin, View):
+    permission_required = 'wishlist.view_itemrequest'
+    limit = 10
+
+    def get(self, request, *args, **kwargs):
+
+        results = [
+            {
+                'id': itemrequest.pk,
+                'text': str(itemrequest),
+                'url': reverse('wishlist:itemrequest-detail', kwargs={'pk': itemrequest.pk}),
+            }
+            for itemrequest in search.ranked_search(ItemRequest.objects.only('description'), request.GET.get('q', ''), self.limit)
+        ]
+
+        return JsonResponse({'results': results})
+
+
+class UserLookup(InstrumentedViewMixin, PermissionRequiredMixin, View):
+    permission_required = 'wishlist.view_itemrequest'
+    page_size = 20
+    cache_timeout = 60
+
+    def get_lookup(self, request):
+        # The cache key and the queryset of one page of users, plus one to tell
+        # whether there are more
+
+        term = request.GET.get('q', '').strip()
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        cache_key = 'wishlist:userlookup:{}:{}'.format(hashlib.md5(term.encode()).hexdigest(), page)
+
+        # startswith rather than icontains so the lookup can use the username index
+        users = get_user_model().objects.filter(username__startswith=term).order_by('username')
+        offset = (page - 1) * self.page_size
+
+        return cache_key, users[offset:offset + self.page_size + 1]
+
+    def lookup_results(self, users):
+        return {
+            'results': [{'id': user.pk, 'text': str(user)} for user in users[:self.page_size]],
+            'more': len(users) > self.page_size,
+        }
+
+    def get(self, request, *args, **kwargs):
+
+        cache_key, users = self.get_lookup(request)
+        results = cache.get(cache_key)
+
+        if results is None:
+            results = self.lookup_results(list(users))
+            cache.set(cache_key, results, self.cache_timeout)
+
+        return JsonResponse(results)
+
+
+class ViewStats(UserPassesTestMixin, View):
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(view_stats())